@@ -1,10 +1,14 @@
-from typing import TypedDict, List
+import asyncio
+from typing import TypedDict, List, Optional
+from langchain_core.runnables import RunnableLambda
 from langgraph.graph import StateGraph, END
 from pydantic import BaseModel, Field
 
-from core.database import SessionLocal
+from core.database import SessionLocal, AsyncSessionLocal
 from models.knowledge_base import KnowledgeItem
-from core.llm import get_embeddings, get_llm
+from core.llm import get_llm
+from services.knowledge_service import apply_search_params, retrieval_query
+from services.embedding_cache import embed_query
 
 class QuizQuestionSchema(BaseModel):
     question: str = Field(description="The question text")
@@ -18,6 +22,9 @@ class QuizList(BaseModel):
 class AuthorState(TypedDict):
     # Inputs
     topic: str
+    # Optional retrieval scope: only facts saved for this research topic / source
+    knowledge_topic: Optional[str]
+    source_url: Optional[str]
     
     # Internal Data
     retrieved_facts: str
@@ -32,18 +39,46 @@ def retrieve_node(state: AuthorState):
     print(f"--- [Author] Retrieving facts for: {state['topic']} ---")
     
     session = SessionLocal()
-    embeddings = get_embeddings()
     
-    # Embed query
-    query_vector = embeddings.embed_query(state['topic'])
+    # Embed query (cached, the same search_query gets re-drafted often)
+    query_vector = embed_query(state['topic'])
     
-    # Search top 5 relevant facts
-    results = session.query(KnowledgeItem).order_by(
-        KnowledgeItem.embedding.l2_distance(query_vector)
-    ).limit(5).all()
+    # Search top 5 relevant facts (ANN index, plus full-text match in hybrid mode)
+    iterative_scan = apply_search_params(session, filtered=_is_scoped(state))
+    results = session.execute(
+        _retrieval_query(state, query_vector, iterative_scan)
+    ).scalars().all()
     
     session.close()
     
+    return _format_facts(results)
+
+async def aretrieve_node(state: AuthorState):
+    """Async version of retrieve_node."""
+    print(f"--- [Author] Retrieving facts for: {state['topic']} ---")
+
+    # Embedding is CPU-bound, keep it off the event loop
+    query_vector = await asyncio.to_thread(embed_query, state['topic'])
+
+    async with AsyncSessionLocal() as session:
+        iterative_scan = await session.run_sync(apply_search_params, filtered=_is_scoped(state))
+        results = (await session.execute(
+            _retrieval_query(state, query_vector, iterative_scan)
+        )).scalars().all()
+
+    return _format_facts(results)
+
+def _is_scoped(state: AuthorState) -> bool:
+    return state.get('knowledge_topic') is not None or state.get('source_url') is not None
+
+def _retrieval_query(state: AuthorState, query_vector, iterative_scan: bool):
+    return retrieval_query(
+        state['topic'], query_vector, limit=5,
+        topic=state.get('knowledge_topic'), source_url=state.get('source_url'),
+        iterative_scan=iterative_scan,
+    )
+
+def _format_facts(results: List[KnowledgeItem]):
     if not results:
         # Fallback if DB is empty
         return {
@@ -57,13 +92,8 @@ def retrieve_node(state: AuthorState):
     
     return {"retrieved_facts": context, "source_urls": sources}
 
-def draft_node(state: AuthorState):
-    """Writes the Tutorial based on retrieved facts."""
-    print("--- [Author] Drafting Content ---")
-    
-    llm = get_llm(temperature=0.4)
-    
-    prompt = f"""
+def _draft_prompt(state: AuthorState) -> str:
+    return f"""
     You are a Financial Course Author for Hong Kong students.
     Write a clear, educational section about: "{state['topic']}".
     
@@ -75,18 +105,27 @@ def draft_node(state: AuthorState):
     3. Tone: Neutral, professional, educational.
     4. formatting: Use paragraphs.
     """
-    
-    response = llm.invoke(prompt)
-    return {"master_content": response.content}
 
-def quiz_node(state: AuthorState):
-    """Generates 1 Question based on the Draft."""
-    print("--- [Author] Generating Quiz ---")
+def draft_node(state: AuthorState):
+    """Writes the Tutorial based on retrieved facts."""
+    print("--- [Author] Drafting Content ---")
     
-    llm = get_llm(temperature=0, model_name="gpt-4o-mini")
-    structured_llm = llm.with_structured_output(QuizList)
+    llm = get_llm(temperature=0.4)
     
-    prompt = f"""
+    response = llm.invoke(_draft_prompt(state))
+    return {"master_content": response.content}
+
+async def adraft_node(state: AuthorState):
+    """Async version of draft_node."""
+    print("--- [Author] Drafting Content ---")
+
+    llm = get_llm(temperature=0.4)
+
+    response = await llm.ainvoke(_draft_prompt(state))
+    return {"master_content": response.content}
+
+def _quiz_prompt(state: AuthorState) -> str:
+    return f"""
     Based STRICTLY on the tutorial text below, generate 1 Multiple Choice Question.
     
     TUTORIAL:
@@ -97,18 +136,38 @@ def quiz_node(state: AuthorState):
     - 4 options per question.
     - Identify the correct answer.
     """
+
+def quiz_node(state: AuthorState):
+    """Generates 1 Question based on the Draft."""
+    print("--- [Author] Generating Quiz ---")
+    
+    llm = get_llm(temperature=0, model_name="gpt-4o-mini")
+    structured_llm = llm.with_structured_output(QuizList)
     
-    result = structured_llm.invoke(prompt)
+    result = structured_llm.invoke(_quiz_prompt(state))
     
     clean_quizzes = [q.model_dump() for q in result.questions]
     
     return {"quiz_data": clean_quizzes}
 
+async def aquiz_node(state: AuthorState):
+    """Async version of quiz_node."""
+    print("--- [Author] Generating Quiz ---")
+
+    llm = get_llm(temperature=0, model_name="gpt-4o-mini")
+    structured_llm = llm.with_structured_output(QuizList)
+
+    result = await structured_llm.ainvoke(_quiz_prompt(state))
+
+    return {"quiz_data": [q.model_dump() for q in result.questions]}
+
 workflow = StateGraph(AuthorState)
 
-workflow.add_node("retrieve", retrieve_node)
-workflow.add_node("draft", draft_node)
-workflow.add_node("quiz", quiz_node)
+# Each node has a sync and an async implementation: invoke() uses the first,
+# ainvoke() the second.
+workflow.add_node("retrieve", RunnableLambda(retrieve_node, afunc=aretrieve_node))
+workflow.add_node("draft", RunnableLambda(draft_node, afunc=adraft_node))
+workflow.add_node("quiz", RunnableLambda(quiz_node, afunc=aquiz_node))
 
 workflow.set_entry_point("retrieve")
 workflow.add_edge("retrieve", "draft")
@@ -117,14 +176,22 @@ workflow.add_edge("quiz", END)
 
 author_app = workflow.compile()
 
-# Helper Function for API
-def run_author_agent(topic: str):
-    """Entry point for the API"""
-    initial_state = {
+def _initial_state(topic: str, knowledge_topic: Optional[str] = None, source_url: Optional[str] = None) -> AuthorState:
+    return {
         "topic": topic,
+        "knowledge_topic": knowledge_topic,
+        "source_url": source_url,
         "retrieved_facts": "",
         "source_urls": [],
         "master_content": "",
         "quiz_data": []
     }
-    return author_app.invoke(initial_state)
\ No newline at end of file
+
+# Helper Function for API
+def run_author_agent(topic: str, knowledge_topic: Optional[str] = None, source_url: Optional[str] = None):
+    """Entry point for the API"""
+    return author_app.invoke(_initial_state(topic, knowledge_topic, source_url))
+
+async def arun_author_agent(topic: str, knowledge_topic: Optional[str] = None, source_url: Optional[str] = None):
+    """Async entry point for the API"""
+    return await author_app.ainvoke(_initial_state(topic, knowledge_topic, source_url))
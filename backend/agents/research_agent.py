@@ -1,14 +1,26 @@
+import asyncio
 import json
-from typing import TypedDict, List
+import operator
+import os
+import time
+from typing import Annotated, TypedDict, List
 
-from langchain_tavily import TavilySearch
+from langchain_core.runnables import RunnableLambda
 from langgraph.graph import StateGraph, END
 from pydantic import BaseModel, Field
+from sqlalchemy import insert, select
 
 from core.llm import get_llm, get_embeddings
-from core.database import SessionLocal
+from core.database import SessionLocal, AsyncSessionLocal
 from models.knowledge_base import KnowledgeItem
 from models.research import ResearchDomain
+from services.search_service import expand_queries, search_many, asearch_many
+from services.safe_domains import cached_safe_domains, remember_safe_domains, safe_domains_generation
+from services.knowledge_service import (
+    KNOWLEDGE_DEDUP_DISTANCE,
+    batch_duplicate_indexes,
+    existing_duplicates_query,
+)
 
 # Default fallback domains if the admin has not configured any yet
 DEFAULT_SAFE_DOMAINS = [
@@ -18,9 +30,17 @@ DEFAULT_SAFE_DOMAINS = [
     "mpfa.org.hk",
 ]
 
+# How many facts are sent to the embedding model per embed_documents call
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "32"))
+
 
 def load_safe_domains() -> List[str]:
-    """Fetch the latest domains from the DB, fallback to defaults."""
+    """Fetch the latest domains (cached, see services/safe_domains), fallback to defaults."""
+    cached = cached_safe_domains()
+    if cached is not None:
+        return cached
+
+    generation = safe_domains_generation()
     session = SessionLocal()
     try:
         records = (
@@ -29,101 +49,216 @@ def load_safe_domains() -> List[str]:
             .order_by(ResearchDomain.domain.asc())
             .all()
         )
-        if records:
-            return [record.domain for record in records]
+        domains = [record.domain for record in records]
     finally:
         session.close()
 
-    return DEFAULT_SAFE_DOMAINS
+    return remember_safe_domains(domains or DEFAULT_SAFE_DOMAINS, generation)
+
+async def aload_safe_domains() -> List[str]:
+    """Async version of load_safe_domains."""
+    cached = cached_safe_domains()
+    if cached is not None:
+        return cached
+
+    generation = safe_domains_generation()
+    async with AsyncSessionLocal() as session:
+        domains = (await session.execute(
+            select(ResearchDomain.domain)
+            .filter(ResearchDomain.is_active == True)  # noqa: E712
+            .order_by(ResearchDomain.domain.asc())
+        )).scalars().all()
+
+    return remember_safe_domains(list(domains) or DEFAULT_SAFE_DOMAINS, generation)
 
 class ResearchState(TypedDict):
     topic: str                  # e.g. MPF in Hong Kong""
     raw_content: str            # Data found from Search
     extracted_facts: List[dict] # Cleaned JSON data
-    logs: list                  # List of logs
+    logs: Annotated[list, operator.add]  # List of logs (each node appends)
     allowed_domains: List[str]
+    facts_skipped: int          # Near-duplicates of stored facts, not inserted
 
 def search_node(state: ResearchState) -> ResearchState:
-    """Uses Tavily to find information on trusted domains. Return combined raw content."""
+    """Searches trusted domains with several sub-queries at once. Return combined raw content."""
     print(f"--- SEARCHING: {state['topic']} ---")
-    
-    tavily = TavilySearch(
-        max_results=3,
-        include_domains=state["allowed_domains"]
-    )
-    results = tavily.invoke(state['topic'])['results']
+    started = time.perf_counter()
+
+    queries = expand_queries(state['topic'])
+    results = search_many(queries, state["allowed_domains"])
     # print("--- SEARCH RESULTS ---")
     # print(results)
 
+    return _combine_results(results, queries, started)
+
+async def asearch_node(state: ResearchState) -> ResearchState:
+    """Async version of search_node."""
+    print(f"--- SEARCHING: {state['topic']} ---")
+    started = time.perf_counter()
+
+    queries = expand_queries(state['topic'])
+    results = await asearch_many(queries, state["allowed_domains"])
+
+    return _combine_results(results, queries, started)
+
+def _combine_results(results: List[dict], queries: List[str], started: float) -> ResearchState:
     # Combine results into one big string for the LLM to read
     combined_content = ""
     for res in results:
         combined_content += f"Source: {res['url']}\nContent: {res['content']}\n\n"
         
-    return {"raw_content": combined_content}
+    elapsed = time.perf_counter() - started
+    return {
+        "raw_content": combined_content,
+        "logs": [f"search: {len(queries)} queries, {len(results)} unique results in {elapsed:.2f}s"],
+    }
+
 
+# STRUCTURED OUTPUT: Force the AI to give us JSON, not text.
+class FactSchema(BaseModel):
+    fact: str = Field(description="A concise financial rule, rate, concept or definition.")
+    source_url: str = Field(description="The URL this fact came from.")
+    
+class FactList(BaseModel):
+    facts: List[FactSchema]
+
+def _extraction_prompt(state: ResearchState) -> str:
+    system_msg = """You are a Data Curator for a Financial Education App.
+    Read the provided raw content. Extract key financial concepts, terms and definitions.
+    Ignore marketing fluff. Return a clean list of facts."""
+    
+    return f"{system_msg}\n\nRAW CONTENT:\n{state['raw_content']}"
 
 def extraction_node(state: ResearchState) -> ResearchState:
     """Uses LLM to read the raw text and pick out FACTS."""
     print("--- EXTRACTING FACTS ---")
+    started = time.perf_counter()
     # github models    
     llm = get_llm()
-
-    # STRUCTURED OUTPUT: Force the AI to give us JSON, not text.
-    class FactSchema(BaseModel):
-        fact: str = Field(description="A concise financial rule, rate, concept or definition.")
-        source_url: str = Field(description="The URL this fact came from.")
-        
-    class FactList(BaseModel):
-        facts: List[FactSchema]
-
     structured_llm = llm.with_structured_output(FactList)
     
-    # Prompt
-    system_msg = """You are a Data Curator for a Financial Education App.
-    Read the provided raw content. Extract key financial concepts, terms and definitions.
-    Ignore marketing fluff. Return a clean list of facts."""
-    
-    response = structured_llm.invoke(f"{system_msg}\n\nRAW CONTENT:\n{state['raw_content']}")
-    
+    response = structured_llm.invoke(_extraction_prompt(state))
+    return _clean_facts(response, started)
+
+async def aextraction_node(state: ResearchState) -> ResearchState:
+    """Async version of extraction_node."""
+    print("--- EXTRACTING FACTS ---")
+    started = time.perf_counter()
+    llm = get_llm()
+    structured_llm = llm.with_structured_output(FactList)
+
+    response = await structured_llm.ainvoke(_extraction_prompt(state))
+    return _clean_facts(response, started)
+
+def _clean_facts(response: FactList, started: float) -> ResearchState:
     # Convert Pydantic models to normal dicts
     clean_facts = [fact.model_dump() for fact in response.facts]
     print(f"--- EXTRACTED {len(clean_facts)} FACTS ---\n")
     print(json.dumps(clean_facts, indent=2))
 
-    return {"extracted_facts": clean_facts}
+    elapsed = time.perf_counter() - started
+    return {
+        "extracted_facts": clean_facts,
+        "logs": [f"extract: {len(clean_facts)} facts in {elapsed:.2f}s"],
+    }
+
+def _embed_facts(state: ResearchState) -> tuple[list[dict], str]:
+    """Embeds all extracted facts in batches and returns the rows to insert."""
+    facts = state['extracted_facts']
+
+    # FREE LOCAL EMBEDDINGS
+    embeddings_model = get_embeddings()
+
+    # This runs on CPU: embed in batches instead of one call per fact
+    started = time.perf_counter()
+    texts = [item['fact'] for item in facts]
+    vectors = []
+    for i in range(0, len(texts), EMBEDDING_BATCH_SIZE):
+        vectors.extend(embeddings_model.embed_documents(texts[i:i + EMBEDDING_BATCH_SIZE]))
+    embed_elapsed = time.perf_counter() - started
+
+    rows = [
+        {
+            "topic": state['topic'],
+            "fact_text": item['fact'],
+            "source_url": item['source_url'],
+            "embedding": vector,
+        }
+        for item, vector in zip(facts, vectors)
+    ]
+    return rows, f"embed: {len(texts)} facts in {embed_elapsed:.2f}s (batch size {EMBEDDING_BATCH_SIZE})"
+
+def _dedup_enabled() -> bool:
+    return KNOWLEDGE_DEDUP_DISTANCE >= 0
+
+def _save_result(rows: list[dict], kept: list[dict], embed_log: str, insert_elapsed: float) -> ResearchState:
+    skipped = len(rows) - len(kept)
+    return {
+        "facts_skipped": skipped,
+        "logs": [
+            embed_log,
+            f"dedup: skipped {skipped} near-duplicate facts (cosine distance <= {KNOWLEDGE_DEDUP_DISTANCE})",
+            f"insert: {len(kept)} rows in {insert_elapsed:.2f}s",
+            f"Saved {len(kept)} items",
+        ],
+    }
 
 def save_node(state: ResearchState) -> ResearchState:
     print("--- SAVING (Using Local Embeddings) ---")
+    if not state['extracted_facts']:
+        return {"logs": ["Saved 0 items"]}
+
+    rows, embed_log = _embed_facts(state)
+
+    # Drop facts we already know (same topic/source, near-identical embedding),
+    # then a single bulk INSERT for the rest
+    started = time.perf_counter()
     session = SessionLocal()
-    
-    # FREE LOCAL EMBEDDINGS
-    embeddings_model = get_embeddings()
-    
-    saved_count = 0
-    for item in state['extracted_facts']:
-        # This runs on CPU
-        vector = embeddings_model.embed_query(item['fact'])
-        
-        new_entry = KnowledgeItem(
-            topic=state['topic'],
-            fact_text=item['fact'],
-            source_url=item['source_url'],
-            embedding=vector
-        )
-        session.add(new_entry)
-        saved_count += 1
-        
-    session.commit()
-    session.close()
-    return {"logs": [f"Saved {saved_count} items"]}
+    try:
+        skip = set()
+        if _dedup_enabled():
+            skip = batch_duplicate_indexes(rows)
+            skip |= set(session.execute(existing_duplicates_query(rows)).scalars())
+        kept = [row for i, row in enumerate(rows) if i not in skip]
+        if kept:
+            session.execute(insert(KnowledgeItem), kept)
+        session.commit()
+    finally:
+        session.close()
+    insert_elapsed = time.perf_counter() - started
+
+    return _save_result(rows, kept, embed_log, insert_elapsed)
+
+async def asave_node(state: ResearchState) -> ResearchState:
+    """Async version of save_node."""
+    print("--- SAVING (Using Local Embeddings) ---")
+    if not state['extracted_facts']:
+        return {"logs": ["Saved 0 items"]}
+
+    # Embedding is CPU-bound, keep it off the event loop
+    rows, embed_log = await asyncio.to_thread(_embed_facts, state)
+
+    started = time.perf_counter()
+    async with AsyncSessionLocal() as session:
+        skip = set()
+        if _dedup_enabled():
+            skip = batch_duplicate_indexes(rows)
+            skip |= set((await session.execute(existing_duplicates_query(rows))).scalars())
+        kept = [row for i, row in enumerate(rows) if i not in skip]
+        if kept:
+            await session.execute(insert(KnowledgeItem), kept)
+        await session.commit()
+    insert_elapsed = time.perf_counter() - started
+
+    return _save_result(rows, kept, embed_log, insert_elapsed)
 
 # BUILD THE GRAPH
 workflow = StateGraph(ResearchState)
 
-workflow.add_node("search", search_node)
-workflow.add_node("extract", extraction_node)
-workflow.add_node("save", save_node)
+# Sync implementation for invoke(), async one for ainvoke()
+workflow.add_node("search", RunnableLambda(search_node, afunc=asearch_node))
+workflow.add_node("extract", RunnableLambda(extraction_node, afunc=aextraction_node))
+workflow.add_node("save", RunnableLambda(save_node, afunc=asave_node))
 
 workflow.set_entry_point("search")
 workflow.add_edge("search", "extract")
@@ -132,21 +267,33 @@ workflow.add_edge("save", END)
 
 research_app = workflow.compile()
 
-def run_research(topic: str) -> dict:
-    """Runs the Research Agent workflow."""
-    safe_domains = load_safe_domains()
-    initial_state: ResearchState = {
+def _initial_state(topic: str, safe_domains: List[str]) -> ResearchState:
+    return {
         "topic": topic,
         "raw_content": "",
         "extracted_facts": [],
         "logs": [],
         "allowed_domains": safe_domains,
+        "facts_skipped": 0,
     }
-    
-    final_state = research_app.invoke(initial_state)
+
+def _summary(topic: str, final_state: ResearchState) -> dict:
     return {
         "status": "completed",
         "topic": topic,
-        "facts_saved": len(final_state['extracted_facts']),
+        "facts_saved": len(final_state['extracted_facts']) - final_state['facts_skipped'],
+        "facts_skipped": final_state['facts_skipped'],
         "logs": final_state['logs']
-    }
\ No newline at end of file
+    }
+
+def run_research(topic: str) -> dict:
+    """Runs the Research Agent workflow."""
+    safe_domains = load_safe_domains()
+    final_state = research_app.invoke(_initial_state(topic, safe_domains))
+    return _summary(topic, final_state)
+
+async def arun_research(topic: str) -> dict:
+    """Async version of run_research."""
+    safe_domains = await aload_safe_domains()
+    final_state = await research_app.ainvoke(_initial_state(topic, safe_domains))
+    return _summary(topic, final_state)
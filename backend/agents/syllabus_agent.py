@@ -12,16 +12,8 @@ class CourseDraft(BaseModel):
     course_description: str = Field(description="Overview/description of the course")
     sections: List[SectionDraft] = Field(description="List of 5-8 distinct sections")
 
-def generate_syllabus(topic: str) -> dict:
-    """
-    Uses LLM to brainstorm a course structure.
-    """
-    llm = get_llm(temperature=0.7)
-    
-    # Force the LLM to return the Pydantic structure
-    structured_llm = llm.with_structured_output(CourseDraft)
-    
-    prompt = f"""
+def _syllabus_prompt(topic: str) -> str:
+    return f"""
     You are an expert Financial Curriculum Designer for Hong Kong teenagers.
     Create a short, engaging course outline about: '{topic}'.
     
@@ -31,6 +23,25 @@ def generate_syllabus(topic: str) -> dict:
     - Structure: 3 to 5 bite-sized sections.
     - Search Query: Create a specific search query for each section so our researcher bot can find data later.
     """
+
+def generate_syllabus(topic: str) -> dict:
+    """
+    Uses LLM to brainstorm a course structure.
+    """
+    llm = get_llm(temperature=0.7)
+    
+    # Force the LLM to return the Pydantic structure
+    structured_llm = llm.with_structured_output(CourseDraft)
     
-    result = structured_llm.invoke(prompt)
-    return result.model_dump()
\ No newline at end of file
+    result = structured_llm.invoke(_syllabus_prompt(topic))
+    return result.model_dump()
+
+async def agenerate_syllabus(topic: str) -> dict:
+    """
+    Async version of generate_syllabus.
+    """
+    llm = get_llm(temperature=0.7)
+    structured_llm = llm.with_structured_output(CourseDraft)
+
+    result = await structured_llm.ainvoke(_syllabus_prompt(topic))
+    return result.model_dump()
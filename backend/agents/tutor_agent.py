@@ -1,4 +1,5 @@
 from typing import TypedDict, List
+from langchain_core.runnables import RunnableLambda
 from langgraph.graph import StateGraph, END
 from pydantic import BaseModel, Field
 import json
@@ -22,13 +23,8 @@ class TutorState(TypedDict):
     personalized_content: str
     personalized_quiz: dict
 
-def style_transfer_node(state: TutorState):
-    """Rewrites content using a metaphor."""
-    print(f"--- [Tutor] Personalizing for {state['user_interest']} ---")
-    
-    llm = get_llm(temperature=0.7) # Creativity allowed here
-    
-    prompt = f"""
+def _style_transfer_prompt(state: TutorState) -> str:
+    return f"""
     You are a Personal Tutor for a student who loves: {state['user_interest']}.
     
     ORIGINAL LESSON:
@@ -42,18 +38,27 @@ def style_transfer_node(state: TutorState):
     2. Use emojis.
     3. Keep it under 200 words.
     """
-    
-    response = llm.invoke(prompt)
-    return {"personalized_content": response.content}
 
-def quiz_adapter_node(state: TutorState):
-    """Rewrites the quiz to match the new metaphor."""
-    print("--- [Tutor] Adapting Quiz ---")
+def style_transfer_node(state: TutorState):
+    """Rewrites content using a metaphor."""
+    print(f"--- [Tutor] Personalizing for {state['user_interest']} ---")
     
-    llm = get_llm(temperature=0)
-    structured_llm = llm.with_structured_output(AdaptedQuiz)
+    llm = get_llm(temperature=0.7) # Creativity allowed here
     
-    prompt = f"""
+    response = llm.invoke(_style_transfer_prompt(state))
+    return {"personalized_content": response.content}
+
+async def astyle_transfer_node(state: TutorState):
+    """Async version of style_transfer_node."""
+    print(f"--- [Tutor] Personalizing for {state['user_interest']} ---")
+
+    llm = get_llm(temperature=0.7)
+
+    response = await llm.ainvoke(_style_transfer_prompt(state))
+    return {"personalized_content": response.content}
+
+def _quiz_adapter_prompt(state: TutorState) -> str:
+    return f"""
     We have rewritten a lesson using a "{state['user_interest']}" metaphor.
     Now, rewrite the Original Quiz to fit that metaphor.
     
@@ -68,13 +73,31 @@ def quiz_adapter_node(state: TutorState):
     Create a new question that tests the same concept but uses the language of the new lesson.
     The logic of the correct answer must remain the same.
     """
+
+def quiz_adapter_node(state: TutorState):
+    """Rewrites the quiz to match the new metaphor."""
+    print("--- [Tutor] Adapting Quiz ---")
     
-    result = structured_llm.invoke(prompt)
+    llm = get_llm(temperature=0)
+    structured_llm = llm.with_structured_output(AdaptedQuiz)
+    
+    result = structured_llm.invoke(_quiz_adapter_prompt(state))
+    return {"personalized_quiz": result.model_dump()}
+
+async def aquiz_adapter_node(state: TutorState):
+    """Async version of quiz_adapter_node."""
+    print("--- [Tutor] Adapting Quiz ---")
+
+    llm = get_llm(temperature=0)
+    structured_llm = llm.with_structured_output(AdaptedQuiz)
+
+    result = await structured_llm.ainvoke(_quiz_adapter_prompt(state))
     return {"personalized_quiz": result.model_dump()}
 
 workflow = StateGraph(TutorState)
-workflow.add_node("style_transfer", style_transfer_node)
-workflow.add_node("adapt_quiz", quiz_adapter_node)
+# Sync implementation for invoke(), async one for ainvoke()
+workflow.add_node("style_transfer", RunnableLambda(style_transfer_node, afunc=astyle_transfer_node))
+workflow.add_node("adapt_quiz", RunnableLambda(quiz_adapter_node, afunc=aquiz_adapter_node))
 
 workflow.set_entry_point("style_transfer")
 workflow.add_edge("style_transfer", "adapt_quiz")
@@ -89,4 +112,34 @@ def run_tutor_agent(content: str, quiz: dict, interest: str):
         "master_quiz": quiz,
         "user_interest": interest
     }
-    return tutor_app.invoke(initial_state)
\ No newline at end of file
+    return tutor_app.invoke(initial_state)
+
+async def arun_tutor_agent(content: str, quiz: dict, interest: str):
+    """Async wrapper to run the agent"""
+    initial_state = {
+        "master_content": content,
+        "master_quiz": quiz,
+        "user_interest": interest
+    }
+    return await tutor_app.ainvoke(initial_state)
+
+async def astream_tutor_agent(content: str, quiz: dict, interest: str):
+    """
+    Streams the agent run. Yields {"type": "token", "content": ...} for every
+    token of the rewritten lesson, then {"type": "result", "data": final_state}.
+    """
+    initial_state = {
+        "master_content": content,
+        "master_quiz": quiz,
+        "user_interest": interest
+    }
+    final_state = None
+    async for mode, chunk in tutor_app.astream(initial_state, stream_mode=["messages", "values"]):
+        if mode == "messages":
+            message, metadata = chunk
+            # Only the lesson text is worth streaming; the quiz is structured output
+            if metadata.get("langgraph_node") == "style_transfer" and message.content:
+                yield {"type": "token", "content": message.content}
+        else:
+            final_state = chunk
+    yield {"type": "result", "data": final_state}
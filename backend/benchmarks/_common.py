@@ -0,0 +1,41 @@
+"""Load-generation helpers shared by the HTTP benchmarks."""
+import asyncio
+import statistics
+import time
+from typing import Awaitable, Callable
+
+import httpx
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(int(round(pct / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+async def hammer(send: Callable[[], Awaitable[httpx.Response]], total: int, concurrency: int) -> dict:
+    """Runs `total` requests from `concurrency` workers; non-200 responses count as errors."""
+    latencies: list[float] = []
+    errors = 0
+    remaining = total
+
+    async def worker():
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            started = time.perf_counter()
+            res = await send()
+            latencies.append((time.perf_counter() - started) * 1000)
+            if res.status_code != 200:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        "concurrency": concurrency,
+        "req_per_sec": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies), 1),
+        "p99_ms": round(percentile(latencies, 99), 1),
+        "errors": errors,
+    }
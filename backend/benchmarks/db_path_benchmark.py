@@ -0,0 +1,100 @@
+"""
+Sync vs async DB path benchmark.
+
+Serves the student dashboard query twice from one uvicorn worker process:
+  /sync/courses   - sync Session (get_db), runs on the request threadpool
+  /async/courses  - the real async route (get_async_db, asyncpg)
+and hammers both with the same concurrency, reporting req/s and p50/p99.
+Auth is bypassed so only the DB path is measured.
+
+    python benchmarks/db_path_benchmark.py --requests 2000 --concurrency 64
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import sys
+
+import httpx
+import uvicorn
+from fastapi import Depends, FastAPI
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.database import SessionLocal, get_db
+from models.user import User
+from routers.student import dashboard_query, dashboard_rows, get_student_courses
+from services.auth_service import Principal, aget_current_user
+
+from _common import hammer
+
+
+def build_app(principal: Principal) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/sync/courses")
+    def sync_courses(db: Session = Depends(get_db)):
+        return dashboard_rows(db.execute(dashboard_query(principal.id)).all())
+
+    app.add_api_route("/async/courses", get_student_courses, methods=["GET"])
+    app.dependency_overrides[aget_current_user] = lambda: principal
+    return app
+
+
+def pick_principal() -> Principal:
+    db = SessionLocal()
+    try:
+        user = db.execute(select(User).limit(1)).scalars().first()
+        if not user:
+            sys.exit("No users in the database, register one first")
+        return Principal.from_user(user)
+    finally:
+        db.close()
+
+
+def serve(port: int):
+    # Runs in a child process so the load generator doesn't compete for the server's GIL
+    uvicorn.run(build_app(pick_principal()), port=port, log_level="warning")
+
+
+async def wait_until_up(client: httpx.AsyncClient):
+    for _ in range(200):
+        try:
+            await client.get("/sync/courses")
+            return
+        except httpx.TransportError:
+            await asyncio.sleep(0.1)
+    sys.exit("Benchmark server did not start")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    server = multiprocessing.Process(target=serve, args=(args.port,), daemon=True)
+    server.start()
+
+    limits = httpx.Limits(max_connections=args.concurrency)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}", limits=limits, timeout=60) as client:
+            await wait_until_up(client)
+            for path in ("/sync/courses", "/async/courses"):
+                send = lambda: client.get(path)
+                await hammer(send, min(args.requests, 100), args.concurrency)  # warm up pools
+                result = await hammer(send, args.requests, args.concurrency)
+                print(
+                    f"{path:<16} {result['req_per_sec']:>8} req/s  "
+                    f"p50 {result['p50_ms']:>7} ms  p99 {result['p99_ms']:>7} ms  errors {result['errors']}"
+                )
+    finally:
+        server.terminate()
+        server.join()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,74 @@
+"""
+Login throughput benchmark.
+
+Fires concurrent POST /auth/token requests at a running API and reports
+logins/sec and latency percentiles for increasing concurrency levels. The
+result to look at is the highest logins/sec whose p99 stays under --p99-ms.
+
+    uvicorn main:app --workers 1 &
+    python benchmarks/login_benchmark.py --url http://localhost:8000 --p99-ms 500
+"""
+import argparse
+import asyncio
+import uuid
+
+import httpx
+
+from _common import hammer
+
+
+async def ensure_user(client: httpx.AsyncClient, email: str, password: str):
+    username = f"bench_{uuid.uuid4().hex[:8]}"
+    res = await client.post(
+        "/users/register",
+        json={"username": username, "email": email, "password": password, "interests": "General"},
+    )
+    if res.status_code not in (201, 400):  # 400 = already registered
+        res.raise_for_status()
+
+
+async def run_level(client: httpx.AsyncClient, email: str, password: str, concurrency: int, total: int) -> dict:
+    result = await hammer(
+        lambda: client.post("/auth/token", data={"username": email, "password": password}), total, concurrency
+    )
+    result["logins_per_sec"] = result.pop("req_per_sec")
+    return result
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--p99-ms", type=float, default=500, help="latency budget for the p99")
+    parser.add_argument("--requests", type=int, default=200, help="logins per concurrency level")
+    parser.add_argument("--levels", default="1,2,4,8,16,32,64")
+    args = parser.parse_args()
+
+    email = "login-bench@example.com"
+    password = "benchmark-password"
+
+    async with httpx.AsyncClient(base_url=args.url, timeout=60) as client:
+        await ensure_user(client, email, password)
+
+        best = None
+        print(f"{'conc':>5} {'logins/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+        for level in (int(x) for x in args.levels.split(",")):
+            result = await run_level(client, email, password, level, args.requests)
+            print(
+                f"{result['concurrency']:>5} {result['logins_per_sec']:>9} "
+                f"{result['p50_ms']:>8} {result['p99_ms']:>8} {result['errors']:>7}"
+            )
+            if result["p99_ms"] <= args.p99_ms and result["errors"] == 0:
+                if best is None or result["logins_per_sec"] > best["logins_per_sec"]:
+                    best = result
+
+    if best:
+        print(
+            f"\nBest: {best['logins_per_sec']} logins/sec at p99 {best['p99_ms']} ms "
+            f"(concurrency {best['concurrency']}, budget {args.p99_ms} ms)"
+        )
+    else:
+        print(f"\nNo level met the p99 budget of {args.p99_ms} ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,21 +1,194 @@
+import importlib.util
 import os
+import threading
+import time
+from typing import Optional
+import httpx
 from langchain_openai import ChatOpenAI
 from langchain_huggingface import HuggingFaceEmbeddings
 
 from dotenv import load_dotenv
 
+from services.llm_cache import get_llm_cache
+
 load_dotenv()
 
+DEFAULT_EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+
+# --- LLM CLIENT POOL ---
+# One ChatOpenAI per (model, temperature, base_url), all sharing one keep-alive
+# HTTP connection pool, so agent nodes don't pay a TLS handshake per call.
+LLM_HTTP2 = os.getenv("LLM_HTTP2", "true").lower() == "true"
+LLM_HTTP_MAX_CONNECTIONS = int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", "20"))
+LLM_HTTP_MAX_KEEPALIVE = int(os.getenv("LLM_HTTP_MAX_KEEPALIVE", "10"))
+# Idle connections are closed after this many seconds
+LLM_HTTP_KEEPALIVE_EXPIRY = float(os.getenv("LLM_HTTP_KEEPALIVE_EXPIRY", "60"))
+LLM_HTTP_CONNECT_TIMEOUT = float(os.getenv("LLM_HTTP_CONNECT_TIMEOUT", "10"))
+# Read timeout, long completions can take a while
+LLM_HTTP_TIMEOUT = float(os.getenv("LLM_HTTP_TIMEOUT", "120"))
+
+_llm_clients: dict[tuple, ChatOpenAI] = {}
+_llm_lock = threading.Lock()
+_http_clients: dict[str, httpx.Client | httpx.AsyncClient] = {}
+_http_stats = {"client_reuses": 0, "requests": 0, "new_connections": 0, "http2_requests": 0}
+_http_stats_lock = threading.Lock()
+
+def _count_trace(event_name: str):
+    with _http_stats_lock:
+        if event_name == "connection.connect_tcp.complete":
+            _http_stats["new_connections"] += 1
+        elif event_name == "http2.send_request_headers.started":
+            _http_stats["http2_requests"] += 1
+
+def _trace(event_name, info):
+    _count_trace(event_name)
+
+async def _atrace(event_name, info):
+    _count_trace(event_name)
+
+def _on_request(request: httpx.Request):
+    with _http_stats_lock:
+        _http_stats["requests"] += 1
+    request.extensions["trace"] = _trace
+
+async def _aon_request(request: httpx.Request):
+    with _http_stats_lock:
+        _http_stats["requests"] += 1
+    request.extensions["trace"] = _atrace
+
+def _http2_enabled() -> bool:
+    # HTTP/2 needs the optional h2 package (httpx[http2])
+    return LLM_HTTP2 and importlib.util.find_spec("h2") is not None
+
+def _http_options() -> dict:
+    if LLM_HTTP2 and not _http2_enabled():
+        print("LLM_HTTP2 is on but the h2 package is missing, using HTTP/1.1 keep-alive")
+    return {
+        "http2": _http2_enabled(),
+        "limits": httpx.Limits(
+            max_connections=LLM_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=LLM_HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=LLM_HTTP_KEEPALIVE_EXPIRY,
+        ),
+        "timeout": httpx.Timeout(LLM_HTTP_TIMEOUT, connect=LLM_HTTP_CONNECT_TIMEOUT),
+    }
+
+def _get_http_clients() -> tuple[httpx.Client, httpx.AsyncClient]:
+    # Called with _llm_lock held
+    if not _http_clients:
+        options = _http_options()
+        _http_clients["sync"] = httpx.Client(event_hooks={"request": [_on_request]}, **options)
+        _http_clients["async"] = httpx.AsyncClient(event_hooks={"request": [_aon_request]}, **options)
+    return _http_clients["sync"], _http_clients["async"]
+
 def get_llm(temperature=0, model_name="gpt-4o-mini"):
-    # github models    
-    llm = ChatOpenAI(
-        model=model_name,
-        api_key=os.getenv("GITHUB_TOKEN"),      
-        base_url=os.getenv("OPENAI_BASE_URL"), 
-        temperature=temperature
-    )
-    return llm
-
-def get_embeddings(model_name="all-MiniLM-L6-v2"):
-    embeddings = HuggingFaceEmbeddings(model_name=model_name)
-    return embeddings
\ No newline at end of file
+    """Returns the shared chat client for this model / temperature (safe to use from any thread)."""
+    base_url = os.getenv("OPENAI_BASE_URL")
+    key = (model_name, temperature, base_url)
+    llm = _llm_clients.get(key)
+    if llm is not None:
+        with _http_stats_lock:
+            _http_stats["client_reuses"] += 1
+        return llm
+
+    with _llm_lock:
+        llm = _llm_clients.get(key)
+        if llm is not None:
+            return llm
+
+        http_client, http_async_client = _get_http_clients()
+        # github models
+        llm = ChatOpenAI(
+            model=model_name,
+            api_key=os.getenv("GITHUB_TOKEN"),
+            base_url=base_url,
+            temperature=temperature,
+            http_client=http_client,
+            http_async_client=http_async_client,
+            # Postgres response cache when LLM_CACHE=true and the temperature is low enough
+            cache=get_llm_cache(model_name, temperature),
+        )
+        _llm_clients[key] = llm
+        return llm
+
+def get_llm_pool_status() -> dict:
+    """Pooled clients and how often HTTP requests reused an open connection."""
+    with _http_stats_lock:
+        stats = dict(_http_stats)
+    requests = stats["requests"]
+    return {
+        **stats,
+        "clients": [
+            {"model": model, "temperature": temperature, "base_url": base_url}
+            for model, temperature, base_url in list(_llm_clients)
+        ],
+        "connection_reuse_rate": round(1 - stats["new_connections"] / requests, 3) if requests else 0.0,
+        "http2": _http2_enabled(),
+        "limits": {
+            "max_connections": LLM_HTTP_MAX_CONNECTIONS,
+            "max_keepalive_connections": LLM_HTTP_MAX_KEEPALIVE,
+            "keepalive_expiry": LLM_HTTP_KEEPALIVE_EXPIRY,
+        },
+    }
+
+# --- EMBEDDING MODEL REGISTRY ---
+# Loading a sentence-transformers model costs seconds of CPU and hundreds of MB,
+# so every agent/service shares one instance per model name for the whole process.
+_embedding_models: dict[str, HuggingFaceEmbeddings] = {}
+_embedding_stats: dict[str, dict] = {}
+_embedding_lock = threading.Lock()
+
+def _rss_mb() -> Optional[float]:
+    """Current resident set size (not the peak, which never goes down), or None off Linux."""
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+def get_embeddings(model_name=DEFAULT_EMBEDDING_MODEL):
+    """Returns the shared embedding model, loading it on first use."""
+    embeddings = _embedding_models.get(model_name)
+    if embeddings is not None:
+        return embeddings
+
+    with _embedding_lock:
+        # Another thread may have finished loading while we waited
+        embeddings = _embedding_models.get(model_name)
+        if embeddings is not None:
+            return embeddings
+
+        print(f"--- [Embeddings] Loading model: {model_name} ---")
+        rss_before = _rss_mb()
+        started = time.perf_counter()
+        embeddings = HuggingFaceEmbeddings(model_name=model_name)
+        load_seconds = time.perf_counter() - started
+        rss_after = _rss_mb()
+        rss_delta = None if None in (rss_before, rss_after) else round(rss_after - rss_before, 1)
+
+        _embedding_stats[model_name] = {
+            "load_seconds": round(load_seconds, 3),
+            "rss_delta_mb": rss_delta,
+            "loaded_at": time.time(),
+            "warmed_up": False,
+        }
+        _embedding_models[model_name] = embeddings
+        return embeddings
+
+def warmup_embeddings(model_names=(DEFAULT_EMBEDDING_MODEL,)):
+    """Loads the models and runs one dummy inference so the first real query is fast."""
+    for model_name in model_names:
+        embeddings = get_embeddings(model_name)
+        started = time.perf_counter()
+        embeddings.embed_query("warmup")
+        _embedding_stats[model_name]["warmup_seconds"] = round(time.perf_counter() - started, 3)
+        _embedding_stats[model_name]["warmed_up"] = True
+
+def get_embeddings_status() -> dict:
+    """Load time and memory for every model currently held by the registry."""
+    rss = _rss_mb()
+    return {
+        "process_rss_mb": round(rss, 1) if rss is not None else None,
+        "models": {name: dict(stats) for name, stats in _embedding_stats.items()},
+    }
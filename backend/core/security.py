@@ -1,4 +1,7 @@
 # app/core/security
+import asyncio
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import timedelta, datetime, timezone
 from typing import Optional
 import jwt
@@ -7,16 +10,67 @@ import os
 from dotenv import load_dotenv
 load_dotenv()
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# bcrypt cost. Hashes with a different cost are transparently re-hashed on next login.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# Dedicated pool for bcrypt so logins never tie up the request threadpool.
+# "thread" is enough when the bcrypt library releases the GIL; use "process" otherwise.
+PASSWORD_HASH_POOL = os.getenv("PASSWORD_HASH_POOL", "thread").lower()
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 2)))
+# Hash jobs allowed to wait/run at once; beyond that logins are shed with 503
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", str(PASSWORD_HASH_WORKERS * 8)))
+
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
+
+class PasswordHashBusy(Exception):
+    """Raised when too many password hashes are already queued."""
+
+_hash_pool = None
+_hash_pool_lock = threading.Lock()
+_hash_slots = threading.BoundedSemaphore(PASSWORD_HASH_MAX_PENDING)
+
+def _get_hash_pool():
+    global _hash_pool
+    with _hash_pool_lock:
+        if _hash_pool is None:
+            if PASSWORD_HASH_POOL == "process":
+                _hash_pool = ProcessPoolExecutor(max_workers=PASSWORD_HASH_WORKERS)
+            else:
+                _hash_pool = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="pwd-hash")
+        return _hash_pool
+
+async def _run_in_hash_pool(fn, *args):
+    if not _hash_slots.acquire(blocking=False):
+        raise PasswordHashBusy()
+    try:
+        return await asyncio.wrap_future(_get_hash_pool().submit(fn, *args))
+    finally:
+        _hash_slots.release()
 
 # Check if a password matches a hashed password
 def verify_pwd(plain_pwd: str, hashed_pwd:str) -> bool:
     return pwd_context.verify(plain_pwd, hashed_pwd)
 
+# Check a password and return a new hash if the stored one uses outdated settings
+def verify_and_update_pwd(plain_pwd: str, hashed_pwd: str) -> tuple[bool, Optional[str]]:
+    return pwd_context.verify_and_update(plain_pwd, hashed_pwd)
+
 # Hash a plain text password
 def get_pwd_hash(pwd: str) -> str:
     return pwd_context.hash(pwd)
 
+# Non-blocking versions (run on the dedicated hash pool)
+async def averify_and_update_pwd(plain_pwd: str, hashed_pwd: str) -> tuple[bool, Optional[str]]:
+    return await _run_in_hash_pool(verify_and_update_pwd, plain_pwd, hashed_pwd)
+
+async def aget_pwd_hash(pwd: str) -> str:
+    return await _run_in_hash_pool(get_pwd_hash, pwd)
+
 # Create a JWT token for authenticated users
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -1,12 +1,18 @@
 from core.database import init_db
 
 from models.knowledge_base import KnowledgeItem
-from models.curriculum import Course, Section, QuizQuestion
+from models.curriculum import Course, Section, QuizQuestion, SectionPersonalization
 from models.user import User
 from models.research import ResearchDomain
+from models.jobs import GenerationJob
+from models.llm_cache import LLMResponse
+from services.knowledge_service import create_embedding_index, create_filter_indexes, create_fulltext_index
 
 def main():
     init_db()
+    create_fulltext_index()
+    create_filter_indexes()
+    create_embedding_index()
     print("Database Initialized Successfully!")
 
 if __name__ == "__main__":
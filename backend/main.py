@@ -1,8 +1,33 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from routers import auth, user, syllabus, course_content, student 
 from fastapi.middleware.cors import CORSMiddleware
+from core.database import get_pool_status
+from core.llm import warmup_embeddings, get_embeddings_status, get_llm_pool_status
+from services.embedding_cache import get_embedding_cache_stats
+from services.personalization_service import get_personalization_stats
+from services.llm_cache import get_llm_cache_stats
+from services.search_service import get_search_stats
+from services.safe_domains import get_safe_domains_stats
+from services.pg_listener import start_listener, stop_listener
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load the embedding model once at startup so the first draft/search doesn't pay for it
+    if os.getenv("EMBEDDINGS_WARMUP", "true").lower() == "true":
+        try:
+            await asyncio.to_thread(warmup_embeddings)
+        except Exception as e:
+            print(f"Embedding warmup failed: {e}")
+    # Keeps this worker's domain allow-list and auth cache in sync with other processes' edits
+    start_listener()
+    yield
+    stop_listener()
 
-app = FastAPI(title="WealthLearn-Backend API")
+app = FastAPI(title="WealthLearn-Backend API", lifespan=lifespan)
 
 origins = [
     "*"
@@ -24,6 +49,41 @@ def read_root():
 def health_check():
     return {"status": "healthy", "service": "learnwealth-backend"}
 
+@app.get("/health/embeddings")
+def embeddings_status():
+    """Load time and memory of the shared embedding models, plus query cache counters."""
+    return {**get_embeddings_status(), "query_cache": get_embedding_cache_stats()}
+
+@app.get("/health/personalization")
+def personalization_status():
+    """Hit rate of the shared (section, interest) personalization store."""
+    return get_personalization_stats()
+
+@app.get("/health/search")
+def search_status():
+    """Research search cache hit rate and duplicates dropped by the fan-out search."""
+    return get_search_stats()
+
+@app.get("/health/safe-domains")
+def safe_domains_status():
+    """Research domain allow-list cache hits, reloads and LISTEN connection state."""
+    return get_safe_domains_stats()
+
+@app.get("/health/llm-cache")
+def llm_cache_status():
+    """Hits, misses and estimated dollars saved by the LLM response cache."""
+    return get_llm_cache_stats()
+
+@app.get("/health/llm-clients")
+def llm_clients_status():
+    """Pooled chat clients and HTTP connection reuse towards the LLM API."""
+    return get_llm_pool_status()
+
+@app.get("/health/db-pool")
+def db_pool_status():
+    """Checked-out connections, overflow usage and checkout wait times."""
+    return get_pool_status()
+
 app.include_router(auth.router, prefix="/auth", tags=["Authentication"])
 app.include_router(user.router, prefix="/users", tags=["User"])
 app.include_router(syllabus.router, prefix="/syllabus", tags=["Syllabus"])
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, JSON, DateTime, UniqueConstraint, func
 from sqlalchemy.orm import relationship
 from core.database import Base
 
@@ -40,4 +40,24 @@ class QuizQuestion(Base):
     correct_answer = Column(String)     
     distractors = Column(JSON) # List of incorrect options
     
-    section = relationship("Section", back_populates="quizzes")
\ No newline at end of file
+    section = relationship("Section", back_populates="quizzes")
+
+class SectionPersonalization(Base):
+    """
+    Shared tutor output, reused by every student with the same interest.
+    Keyed by the section, a hash of its master content + master quiz, and the
+    normalized interest, so editing the section naturally invalidates it.
+    """
+    __tablename__ = "section_personalizations"
+    __table_args__ = (
+        UniqueConstraint("section_id", "content_hash", "interest", name="uq_section_personalization"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    section_id = Column(Integer, ForeignKey("sections.id"), nullable=False)
+    content_hash = Column(String(64), nullable=False)
+    interest = Column(String, nullable=False)       # canonical interest, e.g. "Gaming"
+
+    personalized_content = Column(Text)
+    personalized_quiz = Column(JSON)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
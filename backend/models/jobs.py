@@ -0,0 +1,38 @@
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, JSON, DateTime, Index, func, text
+
+from core.database import Base
+
+
+class GenerationJob(Base):
+    """
+    Durable work queue for AI generation (see services/job_queue and worker.py).
+    Workers claim rows with SELECT ... FOR UPDATE SKIP LOCKED.
+    """
+    __tablename__ = "generation_jobs"
+    __table_args__ = (
+        # At most one active job per user + course (single-flight across processes)
+        Index(
+            "uq_generation_jobs_active",
+            "kind", "user_id", "course_id",
+            unique=True,
+            postgresql_where=text("status IN ('pending', 'running')"),
+        ),
+        Index("ix_generation_jobs_claim", "status", "run_after"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    kind = Column(String, nullable=False, default="prefetch_course")
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    course_id = Column(Integer, ForeignKey("courses.id"), nullable=False)
+
+    status = Column(String, nullable=False, default="pending")   # pending | running | done | failed
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+    run_after = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    locked_at = Column(DateTime(timezone=True), nullable=True)
+    last_error = Column(Text, nullable=True)
+
+    # section_id -> queued/generating/ready/failed/skipped/deferred, written by the worker
+    progress = Column(JSON, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
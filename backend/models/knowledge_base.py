@@ -1,16 +1,40 @@
-from sqlalchemy import Column, Integer, String, Text
+from sqlalchemy import Column, Computed, Index, Integer, String, Text
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import deferred
 from pgvector.sqlalchemy import Vector
 from core.database import Base
 
+# Text search config of fact_tsv; queries must use the same one
+FULLTEXT_CONFIG = "english"
+FACT_TSV_EXPRESSION = f"to_tsvector('{FULLTEXT_CONFIG}', coalesce(fact_text, ''))"
+
 class KnowledgeItem(Base):
     __tablename__ = "knowledge_item"
+    __table_args__ = (
+        Index("ix_knowledge_item_fact_tsv", "fact_tsv", postgresql_using="gin"),
+    )
+    # Don't RETURN fact_tsv after inserts: it's only read inside SQL, and a
+    # database that hasn't run create_fulltext_index yet doesn't have it
+    __mapper_args__ = {"eager_defaults": False}
 
     id = Column(Integer, primary_key=True)
-    topic = Column(String)              
+    # Indexed: retrieval can be scoped to one research topic / source
+    topic = Column(String, index=True)
     fact_text = Column(Text)            
-    source_url = Column(String)
+    source_url = Column(String, index=True)
     
     # "all-MiniLM-L6-v2" uses 384 dimensions
     embedding = Column(Vector(384)) 
 
+    # Maintained by Postgres, used for keyword matches (acronyms like MPF, ORSO).
+    # Deferred: only read inside SQL, never worth loading into Python
+    fact_tsv = deferred(Column(TSVECTOR, Computed(FACT_TSV_EXPRESSION, persisted=True)))
+
+
+class QueryEmbedding(Base):
+    """Persistent cache of query embeddings (see services/embedding_cache)."""
+    __tablename__ = "query_embedding_cache"
 
+    model_name = Column(String, primary_key=True)
+    text_hash = Column(String(64), primary_key=True)   # sha256 of the normalized query
+    embedding = Column(Vector())
@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, func
+
+from core.database import Base
+
+
+class LLMResponse(Base):
+    """
+    Cached chat completions (see services/llm_cache). key_hash covers the model,
+    its parameters (temperature, structured-output schema, ...) and the prompt.
+    """
+    __tablename__ = "llm_response_cache"
+
+    key_hash = Column(String(64), primary_key=True)
+    model_name = Column(String, nullable=False)
+    response = Column(Text, nullable=False)  # serialized langchain generations
+    input_tokens = Column(Integer, nullable=False, default=0)
+    output_tokens = Column(Integer, nullable=False, default=0)
+    hits = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    last_used_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now(), index=True)
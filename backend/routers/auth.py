@@ -6,9 +6,9 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 
-from core.security import create_access_token
+from core.security import create_access_token, PasswordHashBusy
 from core.database import get_db
-from services.auth_service import authenticate_user
+from services.auth_service import aauthenticate_user
 
 router = APIRouter()
 
@@ -17,11 +17,18 @@ class Token(BaseModel):
     token_type: str
 
 @router.post("/token", response_model=Token, status_code=status.HTTP_200_OK)
-def login_for_access_token(
+async def login_for_access_token(
     form_data: Annotated[OAuth2PasswordRequestForm,Depends()], db: Session = Depends(get_db)
 ):
     '''Authenticate user and return access token'''
-    user = authenticate_user(form_data.username, form_data.password, db)
+    try:
+        user = await aauthenticate_user(form_data.username, form_data.password, db)
+    except PasswordHashBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many login attempts, please retry shortly",
+            headers={"Retry-After": "1"},
+        )
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -29,7 +36,7 @@ def login_for_access_token(
             headers={"WWW-Authenticate": "Bearer"},
         ) 
     access_token = create_access_token(
-        data={"sub": user.email},
+        data={"sub": user.email, "uid": user.id},
         expires_delta=timedelta(minutes=24*60*14) # 14 days 
         )
 
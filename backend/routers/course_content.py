@@ -1,13 +1,17 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from pydantic import BaseModel
 from typing import List, Optional
-from agents.research_agent import run_research
-from agents.author_agent import run_author_agent
-from models.curriculum import Section, QuizQuestion
+from agents.research_agent import arun_research
+from agents.author_agent import arun_author_agent
+from services.knowledge_service import create_embedding_index
+from services.safe_domains import invalidate_safe_domains, notify_statement
+from services.quiz_service import save_section_quizzes
+from models.curriculum import Section
 from models.research import ResearchDomain
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session, joinedload
 from sqlalchemy import func
-from core.database import get_db
+from core.database import get_db, get_async_db
 from models.curriculum import Course
 
 router = APIRouter()
@@ -56,26 +60,39 @@ def get_sections(course_id: int, db: Session = Depends(get_db)):
     return payload
 
 @router.post("/admin/research")
-def research_topic(topic: str):
+async def research_topic(topic: str):
     """Scrapes web and saves to Vector DB (KnowledgeItem)"""
-    result = run_research(topic)
+    result = await arun_research(topic)
     return result
 
+@router.post("/admin/knowledge/rebuild-index")
+def rebuild_knowledge_index():
+    """Rebuilds the vector index on KnowledgeItem (run after large research ingests)."""
+    return {"status": "rebuilt", **create_embedding_index(rebuild=True)}
+
 @router.post("/admin/draft-section-content/{section_id}")
-def draft_section_content(section_id: int, db: Session = Depends(get_db)):
+async def draft_section_content(
+    section_id: int,
+    knowledge_topic: Optional[str] = None,
+    source_url: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
     """
     Returns the Content + Quizzes for the Admin to Review/Edit.
     Does NOT save to DB yet.
+    knowledge_topic / source_url limit retrieval to facts from that research run / page.
     """
-    section = db.query(Section).filter(Section.id == section_id).first()
+    section = await db.get(Section, section_id)
     if not section:
         raise HTTPException(status_code=404, detail="Section not found")
     
     # Use the search query we saved during Syllabus generation, or the title
     query = section.key_facts.get("search_query", section.title)
+    # Give the connection back to the pool while the LLM works
+    await db.close()
 
     # Run Graph
-    result = run_author_agent(query)
+    result = await arun_author_agent(query, knowledge_topic=knowledge_topic, source_url=source_url)
     
     # Just return the result so the Frontend can display an "Edit Form"
     return {"status": "success", "data": result}
@@ -107,30 +124,27 @@ def save_section_content(
 ):
     """
     Take the finalized text and quizzes and write them to the DB.
+    Only what changed is written: unchanged quizzes keep their ids, and a save
+    with nothing new doesn't touch the DB at all.
     """
     section = db.query(Section).filter(Section.id == section_id).first()
     if not section:
         raise HTTPException(status_code=404, detail="Section not found")
     
     # 1. Save Master Content (The text)
-    section.master_content = payload.master_content
+    content_changed = section.master_content != payload.master_content
+    if content_changed:
+        section.master_content = payload.master_content
     
-    # 2. Save Quizzes
-    # First, clear old quizzes for this section to avoid duplicates
-    db.query(QuizQuestion).filter(QuizQuestion.section_id == section_id).delete()
-    
-    # Add the new (reviewed) questions
-    for q in payload.quiz_data:
-        new_q = QuizQuestion(
-            section_id=section_id,
-            question_text=q['question'],
-            correct_answer=q['correct_answer'],
-            distractors=q['options'] # Ensure your frontend sends this structure
-        )
-        db.add(new_q)
-        
+    # 2. Save Quizzes (quiz_data items: question, options, correct_answer, optional id)
+    quiz_changes = save_section_quizzes(db, section_id, payload.quiz_data)
+    quizzes_changed = any(quiz_changes[kind] for kind in ("inserted", "updated", "deleted"))
+
+    if not content_changed and not quizzes_changed:
+        return {"status": "unchanged", "content_changed": False, "quizzes": quiz_changes}
+
     db.commit()
-    return {"status": "saved"}
+    return {"status": "saved", "content_changed": content_changed, "quizzes": quiz_changes}
 
 
 @router.get(
@@ -168,13 +182,13 @@ def add_research_domain(payload: ResearchDomainCreate, db: Session = Depends(get
         existing.is_active = True
         if payload.label:
             existing.label = payload.label
-        db.commit()
+        _commit_domain_change(db)
         db.refresh(existing)
         return existing
 
     new_domain = ResearchDomain(domain=normalized_domain, label=payload.label)
     db.add(new_domain)
-    db.commit()
+    _commit_domain_change(db)
     db.refresh(new_domain)
     return new_domain
 
@@ -189,5 +203,12 @@ def delete_research_domain(domain_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Domain not found")
 
     db.delete(record)
+    _commit_domain_change(db)
+    return None
+
+
+def _commit_domain_change(db: Session):
+    # NOTIFY is sent on commit, so other workers never reload before the change is visible
+    db.execute(notify_statement())
     db.commit()
-    return None
\ No newline at end of file
+    invalidate_safe_domains()
\ No newline at end of file
@@ -1,34 +1,52 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
-from services.auth_service import get_current_user
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Query
+from fastapi.responses import StreamingResponse
+from services.auth_service import aget_current_user
+from sqlalchemy import and_, distinct, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
 
-from core.database import get_db
+from core.database import get_async_db
 from models.user import StudentProgress, User
 from models.curriculum import Course, Section
-from services.tutor_service import prefetch_course_content 
+from services.prefetch_registry import schedule_prefetch, get_prefetch_status as get_prefetch_job_status
+from services.section_stream import section_event_stream
 
 router = APIRouter()
 
 # --- INPUT SCHEMAS (For React JSON Body) ---
 
-# Dashboard and Course Interaction Endpoints
-@router.get("/student/courses")
-def get_student_courses(db: Session = Depends(get_db), user = Depends(get_current_user)):
-    """Returns list of courses with calculated progress."""
-    courses = db.query(Course).all()
+def dashboard_query(user_id: int, limit: Optional[int] = None, offset: int = 0):
+    """Courses with total / completed section counts for one user."""
+    # One round trip: courses LEFT JOIN sections LEFT JOIN this user's completed progress
+    query = (
+        select(
+            Course.id,
+            Course.title,
+            Course.description,
+            func.count(distinct(Section.id)).label("total"),
+            func.count(distinct(StudentProgress.section_id)).label("completed"),
+        )
+        .outerjoin(Section, Section.course_id == Course.id)
+        .outerjoin(
+            StudentProgress,
+            and_(
+                StudentProgress.section_id == Section.id,
+                StudentProgress.user_id == user_id,
+                StudentProgress.is_completed == True,  # noqa: E712
+            ),
+        )
+        .group_by(Course.id)
+        .order_by(Course.id)
+        .offset(offset)
+    )
+    if limit is not None:
+        query = query.limit(limit)
+    return query
+
+def dashboard_rows(rows) -> list[dict]:
     result = []
-    
-    for c in courses:
-        total = len(c.sections)
-        # Find completed sections for this user in this course
-        completed = db.query(StudentProgress).filter(
-            StudentProgress.user_id == user.id,
-            StudentProgress.is_completed == True,
-            StudentProgress.section_id.in_([s.id for s in c.sections])
-        ).count()
-        
-        pct = int((completed / total) * 100) if total > 0 else 0
+    for c in rows:
+        pct = int((c.completed / c.total) * 100) if c.total > 0 else 0
         result.append({
             "id": c.id, 
             "title": c.title, 
@@ -37,63 +55,108 @@ def get_student_courses(db: Session = Depends(get_db), user = Depends(get_curren
         })
     return result
 
+# Dashboard and Course Interaction Endpoints
+@router.get("/student/courses")
+async def get_student_courses(
+    limit: Optional[int] = Query(None, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_async_db),
+    user = Depends(aget_current_user),
+):
+    """Returns list of courses with calculated progress (optionally paginated)."""
+    rows = (await db.execute(dashboard_query(user.id, limit, offset))).all()
+    return dashboard_rows(rows)
+
 # get course details with sections and lock status
 @router.get("/student/course/{course_id}")
-def get_course_details(course_id: int, db: Session = Depends(get_db), user = Depends(get_current_user)):
+async def get_course_details(
+    course_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    user = Depends(aget_current_user),
+):
     """Returns map of sections. Locks future sections."""
-    course = db.query(Course).filter(Course.id == course_id).first()
-    if not course:
+    # One slim query: only ids/titles/flags, never the heavy content columns.
+    # Sorted by order_index in the DB to ensure correct flow.
+    result = await db.execute(
+        select(
+            Course.title.label("course_title"),
+            Section.id,
+            Section.title,
+            func.coalesce(func.bool_or(StudentProgress.is_completed), False).label("is_completed"),
+        )
+        .outerjoin(Section, Section.course_id == Course.id)
+        .outerjoin(
+            StudentProgress,
+            and_(StudentProgress.section_id == Section.id, StudentProgress.user_id == user.id),
+        )
+        .filter(Course.id == course_id)
+        .group_by(Course.title, Section.id, Section.title, Section.order_index)
+        .order_by(Section.order_index, Section.id)
+    )
+    rows = result.all()
+    if not rows:
         raise HTTPException(status_code=404, detail="Course not found")
     
     sections_data = []
     is_unlocked = True # First section is always open
-    
-    # Sort by order_index to ensure correct flow
-    sorted_sections = sorted(course.sections, key=lambda x: x.order_index)
 
-    for sec in sorted_sections:
-        prog = db.query(StudentProgress).filter_by(user_id=user.id, section_id=sec.id).first()
-        is_completed = prog.is_completed if prog else False
+    for sec in rows:
+        if sec.id is None:
+            continue  # course without sections
         
         sections_data.append({
             "id": sec.id,
             "title": sec.title,
             "is_locked": not is_unlocked, # Locked if previous wasn't unlocked
-            "is_completed": is_completed
+            "is_completed": sec.is_completed
         })
         
         # Logic: If this one isn't done, lock the NEXT one.
-        if not is_completed:
+        if not sec.is_completed:
             is_unlocked = False 
             
-    return {"course": course.title, "sections": sections_data}
+    return {"course": rows[0].course_title, "sections": sections_data}
 
 # enroll in course and trigger background content generation
 @router.post("/student/course/{course_id}/enroll")
-def enroll_in_course(
+async def enroll_in_course(
     course_id: int, 
     background_tasks: BackgroundTasks, 
-    db: Session = Depends(get_db), 
-    user = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db), 
+    user = Depends(aget_current_user)
 ):
     """Triggers background generation."""
-    # Add task to background
-    background_tasks.add_task(prefetch_course_content, course_id, user.id, db)
+    # Add task to background / job queue (joins the running job if there is one).
+    # An explicit enroll may retry a job that failed for good; polling /content may not.
+    await db.run_sync(schedule_prefetch, background_tasks, user.id, course_id, retry_failed=True)
     return {"status": "enrolled", "message": "AI started generating content."}
 
+# per-section progress of the background generation
+@router.get("/student/course/{course_id}/prefetch-status")
+async def get_prefetch_status(
+    course_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    user = Depends(aget_current_user),
+):
+    """Returns the state of the current (or last) generation job for this course."""
+    return await db.run_sync(get_prefetch_job_status, user.id, course_id)
+
 # section content retrieval
 @router.get("/student/section/{section_id}/content")
-def get_section_content(
+async def get_section_content(
     section_id: int, 
     background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db),
-    user = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    user = Depends(aget_current_user)
 ):
     """
     Called when user clicks a lesson.
-    Returns {status: 'ready', content: ...} or {status: 'processing'}
+    Returns {status: 'ready', content: ...} or {status: 'processing'}, or
+    'unavailable' / 'failed' once generation ended without this section.
     """
-    progress = db.query(StudentProgress).filter_by(user_id=user.id, section_id=section_id).first()
+    progress = (await db.execute(
+        select(StudentProgress).filter_by(user_id=user.id, section_id=section_id)
+    )).scalars().first()
     
     # CASE A: Ready
     if progress and progress.personalized_content:
@@ -105,31 +168,62 @@ def get_section_content(
     
     # CASE B: User forgot to Enroll, or Enroll failed. Trigger Fallback.
     # We find the course_id for this section and trigger generation now.
-    section = db.query(Section).filter(Section.id == section_id).first()
-    if section:
-        # Re-trigger background task just in case
-        background_tasks.add_task(prefetch_course_content, section.course_id, user.id, db)
+    course_id = await db.scalar(select(Section.course_id).filter(Section.id == section_id))
+    if course_id:
+        # Re-trigger background task just in case (no-op while a job is running, the
+        # last one finished recently, or it failed; only enroll retries failures)
+        scheduled = await db.run_sync(schedule_prefetch, background_tasks, user.id, course_id)
+        if not scheduled:
+            job = await db.run_sync(get_prefetch_job_status, user.id, course_id)
+            ended = _ended_without_section(job, section_id)
+            if ended:
+                return ended
 
     return {"status": "processing", "message": "AI is writing... please poll again in 2s"}
 
+def _ended_without_section(job: dict, section_id: int) -> Optional[dict]:
+    # Tell the poller to stop instead of answering "processing" forever
+    if job["status"] in ("idle", "pending", "running"):
+        return None
+    sections = job.get("sections") or {}
+    # In-process jobs key sections by int, queue jobs (JSON) by str
+    section_status = sections.get(section_id, sections.get(str(section_id)))
+    if section_status == "skipped":
+        return {"status": "unavailable", "message": "This lesson has not been published yet"}
+    if section_status == "failed" or job["status"] == "failed":
+        return {"status": "failed", "message": "Generating this lesson failed, enroll again to retry"}
+    return None
+
+# section content as server-sent events (no polling)
+@router.get("/student/section/{section_id}/stream")
+def stream_section_content(section_id: int, user = Depends(aget_current_user)):
+    """
+    Same content as /content, pushed over SSE: status changes, the lesson
+    tokens as the tutor writes them, then a final `ready` event.
+    """
+    return StreamingResponse(
+        section_event_stream(user.id, section_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 # quiz submission and unlocking next section
 @router.post("/student/section/{section_id}/submit")
-def submit_quiz(
+async def submit_quiz(
     section_id: int, 
     correct: bool,
-    db: Session = Depends(get_db),
-    user = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    user = Depends(aget_current_user)
 ):
     """Unlocks the next section."""
-    progress = db.query(StudentProgress).filter_by(
-        user_id=user.id, 
-        section_id=section_id
-    ).first()
+    progress = (await db.execute(
+        select(StudentProgress).filter_by(user_id=user.id, section_id=section_id)
+    )).scalars().first()
     
     if progress:
         progress.is_completed = True
         progress.quiz_score = 100 if correct else 0
-        db.commit()
+        await db.commit()
         return {"status": "success", "unlocked_next": True}
     
     raise HTTPException(status_code=404, detail="Progress record not found")
\ No newline at end of file
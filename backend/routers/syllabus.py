@@ -1,43 +1,44 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 
-from agents.syllabus_agent import generate_syllabus as generate_syllabus_from_agent
-from models.curriculum import Course, Section
+from agents.syllabus_agent import agenerate_syllabus as generate_syllabus_from_agent
+from services.course_import import CourseImport, import_courses, parse_course_import
 from sqlalchemy.orm import Session
 from core.database import get_db
 
 router = APIRouter()
 
 @router.post("/admin/generate-syllabus")
-def generate_syllabus_endpoint(topic: str):
+async def generate_syllabus_endpoint(topic: str):
     """AI brainstorms the syllabus structure."""
-    draft = generate_syllabus_from_agent(topic)
+    draft = await generate_syllabus_from_agent(topic)
     return draft
 
 @router.post("/admin/create-course")
-def create_course(course_data: dict, db: Session = Depends(get_db)):
+def create_course(course_data: CourseImport, db: Session = Depends(get_db)):
     """Admin approves and saves to DB."""
-    
-    new_course = Course(
-        title=course_data['course_title'],
-        description=course_data['course_description'],
-        level="Beginner"
-    )
-    db.add(new_course)
+    result = import_courses(db, [course_data])
     db.commit()
-    db.refresh(new_course)
-    
-    # Create Sections
-    for index, sec in enumerate(course_data['sections']):
-        new_section = Section(
-            course_id=new_course.id,
-            title=sec['title'],
-            order_index=index + 1,
-            # We store the search query temporarily in key_facts or a new column
-            # so the Research Agent knows what to search next.
-            key_facts={"search_query": sec['search_query']},
-            master_content="" # Researcher will fill this
-        )
-        db.add(new_section)
-    
+    return {"status": "success", "course_id": result["course_ids"][0]}
+
+@router.post("/admin/import-courses")
+async def import_courses_endpoint(request: Request, db: Session = Depends(get_db)):
+    """
+    Bulk seed a catalog: courses with sections and optional quizzes, as a JSON
+    list or NDJSON (Content-Type: application/x-ndjson). All or nothing.
+    """
+    try:
+        courses = parse_course_import(await request.body(), request.headers.get("content-type", ""))
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    if not courses:
+        raise HTTPException(status_code=422, detail="No courses in the request body")
+
+    result = await run_in_threadpool(_import, db, courses)
+    return {"status": "success", **result}
+
+def _import(db: Session, courses: list[CourseImport]) -> dict:
+    # On failure nothing is committed; get_db closes (rolls back) the session
+    result = import_courses(db, courses)
     db.commit()
-    return {"status": "success", "course_id": new_course.id}
\ No newline at end of file
+    return result
@@ -1,13 +1,15 @@
 # app/routers/users.py
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy import func
 from sqlalchemy.orm import Session
 from datetime import datetime, timezone
 from pydantic import BaseModel, EmailStr
 
 from core.database import get_db
+from core.security import aget_pwd_hash, PasswordHashBusy
 from services.user_service import get_users, get_user_by_id, get_user_by_email, get_user_by_username, create_user, delete_user
-from services.auth_service import get_current_user
+from services.auth_service import aget_current_user
 
 router = APIRouter()
 
@@ -31,8 +33,8 @@ def user_list(db: Session = Depends(get_db)):
     return db_users
     
 @router.get("/me", response_model=UserOutput, status_code=status.HTTP_200_OK)
-def current_user_info(
-    user = Depends(get_current_user)
+async def current_user_info(
+    user = Depends(aget_current_user)
 ):
     '''Retrieves information about the current authenticated user'''
     return user
@@ -48,14 +50,24 @@ def user_delete(user_id: int, db: Session = Depends(get_db)):
     return 
     
 @router.post("/register", response_model=UserOutput, status_code=status.HTTP_201_CREATED)
-def register(user: UserCreate, db: Session = Depends(get_db)):
+async def register(user: UserCreate, db: Session = Depends(get_db)):
     '''Registers a new user'''
-    db_user_by_email = get_user_by_email(db=db, email=user.email)
+    db_user_by_email = await run_in_threadpool(get_user_by_email, db=db, email=user.email)
     if db_user_by_email:
         raise HTTPException(status_code=400, detail="Email already registered")
     
-    db_user_by_username = get_user_by_username(db=db, username=user.username)
+    db_user_by_username = await run_in_threadpool(get_user_by_username, db=db, username=user.username)
     if db_user_by_username:
         raise HTTPException(status_code=400, detail="Username already exists")
+
+    # bcrypt runs on the dedicated hash pool, not the request threadpool
+    try:
+        hashed_pwd = await aget_pwd_hash(user.password)
+    except PasswordHashBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server busy, please retry shortly",
+            headers={"Retry-After": "1"},
+        )
     
-    return create_user(db=db, user=user)
+    return await run_in_threadpool(create_user, db=db, user=user, hashed_pwd=hashed_pwd)
@@ -1,24 +1,118 @@
+import hashlib
+import threading
+import time
+from dataclasses import dataclass
 from typing import Annotated
 from pydantic import BaseModel
 
 import jwt
 from fastapi import Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import event, inspect
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from typing import Optional
 
-from core.database import get_db
+from core.database import get_db, get_async_db
 from models.user import User
-from services.user_service import get_user_by_email
-from core.security import verify_pwd
+from services.user_service import get_user_by_email, get_user_by_id, aget_user_by_email, aget_user_by_id
+from core.security import verify_pwd, averify_and_update_pwd
+from services import pg_listener
 
 import os
 from dotenv import load_dotenv
 load_dotenv()
 
+# Read once, not on every request
+SECRET_KEY = os.getenv("SECRET_KEY")
+ALGORITHM = os.getenv("ALGORITHM")
+
+# Verified tokens are remembered this long, so most requests skip the users SELECT.
+# Deleting a user or changing their tier through the ORM invalidates immediately here and,
+# via NOTIFY on commit, in every other process; bulk UPDATEs are only bounded by the TTL.
+AUTH_CACHE_TTL_SECONDS = int(os.getenv("AUTH_CACHE_TTL_SECONDS", "60"))
+AUTH_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "10000"))
+# Postgres channel carrying the id of a deleted user / changed tier
+AUTH_USERS_CHANNEL = "auth_user_changed"
+
 class TokenData(BaseModel):
     email: Optional[str] = None
+    user_id: Optional[int] = None
+
+@dataclass(frozen=True)
+class Principal:
+    """Detached snapshot of the authenticated user (safe to share between requests)."""
+    id: int
+    username: str
+    email: str
+    account_tier: str
+    interests: Optional[str]
+
+    @classmethod
+    def from_user(cls, user: User) -> "Principal":
+        return cls(
+            id=user.id,
+            username=user.username,
+            email=user.email,
+            account_tier=user.account_tier,
+            interests=user.interests,
+        )
+
+# sha256(token) -> (expires_at, principal), plus user_id -> token hashes for invalidation
+_principal_cache: dict[str, tuple[float, Principal]] = {}
+_tokens_by_user: dict[int, set[str]] = {}
+_cache_lock = threading.Lock()
+
+def _cache_get(token_hash: str) -> Optional[Principal]:
+    with _cache_lock:
+        entry = _principal_cache.get(token_hash)
+        if not entry:
+            return None
+        expires_at, principal = entry
+        if expires_at < time.monotonic():
+            del _principal_cache[token_hash]
+            return None
+        return principal
+
+def _cache_put(token_hash: str, principal: Principal):
+    with _cache_lock:
+        if len(_principal_cache) >= AUTH_CACHE_MAX_ENTRIES:
+            _principal_cache.clear()
+            _tokens_by_user.clear()
+        _principal_cache[token_hash] = (time.monotonic() + AUTH_CACHE_TTL_SECONDS, principal)
+        _tokens_by_user.setdefault(principal.id, set()).add(token_hash)
+
+def invalidate_user(user_id: int):
+    """Drops every cached token of a user (call on delete / tier change)."""
+    with _cache_lock:
+        for token_hash in _tokens_by_user.pop(user_id, set()):
+            _principal_cache.pop(token_hash, None)
+
+def clear_principal_cache():
+    with _cache_lock:
+        _principal_cache.clear()
+        _tokens_by_user.clear()
+
+pg_listener.subscribe(AUTH_USERS_CHANNEL, lambda payload: invalidate_user(int(payload)),
+                      on_reconnect=clear_principal_cache)
+
+@event.listens_for(User, "after_delete")
+def _invalidate_deleted_user(mapper, connection, target):
+    invalidate_user(target.id)
+    connection.execute(pg_listener.notify_statement(AUTH_USERS_CHANNEL, str(target.id)))
+
+@event.listens_for(User.account_tier, "set")
+def _invalidate_tier_change(target, value, oldvalue, initiator):
+    if target.id is not None and value != oldvalue:
+        invalidate_user(target.id)
+
+@event.listens_for(User, "after_update")
+def _notify_tier_change(mapper, connection, target):
+    # Runs in the flush, so other processes hear about it only once the change commits
+    if inspect(target).attrs.account_tier.history.has_changes():
+        connection.execute(pg_listener.notify_statement(AUTH_USERS_CHANNEL, str(target.id)))
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/token")
 
@@ -30,29 +124,84 @@ def authenticate_user(email: str, pwd: str, db: Session) -> User | None:
         return None
     return user
 
-def get_current_user(
-    token: Annotated[str, Depends(oauth2_scheme)],
-    db: Session = Depends(get_db),
-) -> User:
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
+def _save_rehash(db: Session, user: User, new_hash: str):
+    user.hashed_pwd = new_hash
+    db.commit()
+    db.refresh(user)
+
+async def aauthenticate_user(email: str, pwd: str, db: Session) -> User | None:
+    """
+    Like authenticate_user, but bcrypt runs on the dedicated hash pool.
+    Re-hashes the password if it was stored with outdated BCRYPT_ROUNDS.
+    """
+    user = await run_in_threadpool(get_user_by_email, db, email)
+    if not user:
+        return None
+    valid, new_hash = await averify_and_update_pwd(pwd, user.hashed_pwd)
+    if not valid:
+        return None
+    if new_hash:
+        await run_in_threadpool(_save_rehash, db, user, new_hash)
+    return user
+
+credentials_exception = HTTPException(
+    status_code=status.HTTP_401_UNAUTHORIZED,
+    detail="Could not validate credentials",
+    headers={"WWW-Authenticate": "Bearer"},
+)
+
+def _decode_token(token: str) -> TokenData:
     try:
-        payload = jwt.decode(token, os.getenv("SECRET_KEY"), algorithms=[os.getenv("ALGORITHM")])
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email = payload.get("sub")
         if email is None:
             raise credentials_exception
-        token_data = TokenData(email=email)
+        return TokenData(email=email, user_id=payload.get("uid"))
     except jwt.InvalidTokenError:
         raise credentials_exception
-    user = get_user_by_email(db, email=token_data.email)
-    if user is None:
+
+def _to_principal(token_hash: str, token_data: TokenData, user: Optional[User]) -> Principal:
+    if user is None or user.email != token_data.email:
         raise credentials_exception
-    return user
+    principal = Principal.from_user(user)
+    _cache_put(token_hash, principal)
+    return principal
+
+def get_current_user(
+    token: Annotated[str, Depends(oauth2_scheme)],
+    db: Session = Depends(get_db),
+) -> Principal:
+    token_hash = hashlib.sha256(token.encode("utf-8")).hexdigest()
+    principal = _cache_get(token_hash)
+    if principal:
+        return principal
+
+    token_data = _decode_token(token)
+    # Newer tokens carry the user id: primary-key lookup instead of by email
+    if token_data.user_id is not None:
+        user = get_user_by_id(db, token_data.user_id)
+    else:
+        user = get_user_by_email(db, email=token_data.email)
+    return _to_principal(token_hash, token_data, user)
+
+async def aget_current_user(
+    token: Annotated[str, Depends(oauth2_scheme)],
+    db: AsyncSession = Depends(get_async_db),
+) -> Principal:
+    """Same as get_current_user, for routes running on the async engine."""
+    token_hash = hashlib.sha256(token.encode("utf-8")).hexdigest()
+    principal = _cache_get(token_hash)
+    if principal:
+        return principal
+
+    token_data = _decode_token(token)
+    if token_data.user_id is not None:
+        user = await aget_user_by_id(db, token_data.user_id)
+    else:
+        user = await aget_user_by_email(db, email=token_data.email)
+    return _to_principal(token_hash, token_data, user)
 
-def get_current_admin_user(db: Session = Depends(get_db), user: User = Depends(get_current_user)) -> User:
+def get_current_admin_user(db: Session = Depends(get_db), user: Principal = Depends(get_current_user)) -> Principal:
     if user.account_tier != "admin":
         # print("User is not admin:", user.account_tier)
         raise HTTPException(
@@ -0,0 +1,122 @@
+import json
+import os
+import time
+from typing import List, Optional
+
+from pydantic import BaseModel, Field, TypeAdapter, ValidationError
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from models.curriculum import Course, QuizQuestion, Section
+
+# Rows per INSERT ... RETURNING statement
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "500"))
+
+class QuizImport(BaseModel):
+    # Same shape as the author agent's quiz_data
+    question: str
+    options: List[str] = Field(default_factory=list)
+    correct_answer: str
+
+class SectionImport(BaseModel):
+    title: str
+    search_query: Optional[str] = None
+    master_content: str = ""
+    quizzes: List[QuizImport] = Field(default_factory=list)
+
+class CourseImport(BaseModel):
+    # Same keys as the syllabus agent's draft
+    course_title: str
+    course_description: str = ""
+    level: str = "Beginner"
+    sections: List[SectionImport] = Field(default_factory=list)
+
+_courses_adapter = TypeAdapter(List[CourseImport])
+
+def parse_course_import(body: bytes, content_type: str) -> List[CourseImport]:
+    """
+    JSON (a list of courses, or {"courses": [...]}) or NDJSON (one course per line).
+    Raises ValueError with the offending line / field.
+    """
+    if "ndjson" in content_type or "jsonl" in content_type:
+        courses = []
+        for line_no, line in enumerate(body.decode("utf-8").splitlines(), start=1):
+            if not line.strip():
+                continue
+            try:
+                courses.append(CourseImport.model_validate_json(line))
+            except ValidationError as e:
+                raise ValueError(f"line {line_no}: {e}") from e
+        return courses
+
+    try:
+        data = json.loads(body)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"invalid JSON: {e}") from e
+    if isinstance(data, dict):
+        data = data.get("courses", [data])
+    try:
+        return _courses_adapter.validate_python(data)
+    except ValidationError as e:
+        raise ValueError(str(e)) from e
+
+def _insert_returning_ids(db: Session, model, rows: List[dict]) -> List[int]:
+    ids = []
+    for start in range(0, len(rows), IMPORT_BATCH_SIZE):
+        ids.extend(db.execute(
+            insert(model).returning(model.id, sort_by_parameter_order=True),
+            rows[start:start + IMPORT_BATCH_SIZE],
+        ).scalars().all())
+    return ids
+
+def import_courses(db: Session, courses: List[CourseImport]) -> dict:
+    """
+    Inserts courses, their sections and quizzes with batched INSERT ... RETURNING
+    (a handful of statements, not one per row). Runs in the caller's transaction
+    and does not commit, so a failed import leaves nothing behind.
+    """
+    started = time.perf_counter()
+
+    course_ids = _insert_returning_ids(db, Course, [
+        {"title": c.course_title, "description": c.course_description, "level": c.level}
+        for c in courses
+    ])
+
+    section_rows, section_quizzes = [], []
+    for course_id, course in zip(course_ids, courses):
+        for index, sec in enumerate(course.sections):
+            section_rows.append({
+                "course_id": course_id,
+                "title": sec.title,
+                "order_index": index + 1,
+                # The Research Agent picks this up to know what to search next
+                "key_facts": {"search_query": sec.search_query} if sec.search_query else {},
+                "master_content": sec.master_content,
+            })
+            section_quizzes.append(sec.quizzes)
+    section_ids = _insert_returning_ids(db, Section, section_rows)
+
+    quiz_rows = [
+        {
+            "section_id": section_id,
+            "question_text": q.question,
+            "correct_answer": q.correct_answer,
+            "distractors": q.options,
+        }
+        for section_id, quizzes in zip(section_ids, section_quizzes)
+        for q in quizzes
+    ]
+    # Nothing references quiz ids, a plain executemany is enough
+    for start in range(0, len(quiz_rows), IMPORT_BATCH_SIZE):
+        db.execute(insert(QuizQuestion), quiz_rows[start:start + IMPORT_BATCH_SIZE])
+
+    elapsed = time.perf_counter() - started
+    rows = len(course_ids) + len(section_ids) + len(quiz_rows)
+    return {
+        "course_ids": course_ids,
+        "courses": len(course_ids),
+        "sections": len(section_ids),
+        "quizzes": len(quiz_rows),
+        "seconds": round(elapsed, 3),
+        "rows_per_sec": round(rows / elapsed, 1) if elapsed else None,
+    }
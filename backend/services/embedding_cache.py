@@ -0,0 +1,89 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from sqlalchemy.dialects.postgresql import insert
+
+from core.database import SessionLocal
+from core.llm import DEFAULT_EMBEDDING_MODEL, get_embeddings
+from models.knowledge_base import QueryEmbedding
+
+# Level 1: in-process LRU. Level 2 (optional): query_embedding_cache table shared by all workers.
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "2048"))
+EMBEDDING_CACHE_PERSIST = os.getenv("EMBEDDING_CACHE_PERSIST", "false").lower() == "true"
+
+_cache: OrderedDict = OrderedDict()
+_lock = threading.Lock()
+_stats = {"memory_hits": 0, "db_hits": 0, "misses": 0}
+
+def _cache_key(text: str, model_name: str) -> tuple[str, str]:
+    # Collapse whitespace only, the tokenizer ignores it anyway
+    normalized = " ".join(text.split())
+    return model_name, hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+def _remember(key: tuple[str, str], vector: list[float]):
+    with _lock:
+        _cache[key] = vector
+        _cache.move_to_end(key)
+        while len(_cache) > EMBEDDING_CACHE_SIZE:
+            _cache.popitem(last=False)
+
+def _load_persisted(key: tuple[str, str]) -> list[float] | None:
+    session = SessionLocal()
+    try:
+        record = session.get(QueryEmbedding, key)
+        return [float(x) for x in record.embedding] if record else None
+    finally:
+        session.close()
+
+def _persist(key: tuple[str, str], vector: list[float]):
+    session = SessionLocal()
+    try:
+        session.execute(
+            insert(QueryEmbedding)
+            .values(model_name=key[0], text_hash=key[1], embedding=vector)
+            .on_conflict_do_nothing()
+        )
+        session.commit()
+    finally:
+        session.close()
+
+def embed_query(text: str, model_name: str = DEFAULT_EMBEDDING_MODEL) -> list[float]:
+    """Cached drop-in for get_embeddings(model_name).embed_query(text)."""
+    key = _cache_key(text, model_name)
+
+    with _lock:
+        vector = _cache.get(key)
+        if vector is not None:
+            _cache.move_to_end(key)
+            _stats["memory_hits"] += 1
+            return vector
+
+    if EMBEDDING_CACHE_PERSIST:
+        vector = _load_persisted(key)
+        if vector is not None:
+            with _lock:
+                _stats["db_hits"] += 1
+            _remember(key, vector)
+            return vector
+
+    vector = get_embeddings(model_name).embed_query(text)
+    with _lock:
+        _stats["misses"] += 1
+    _remember(key, vector)
+    if EMBEDDING_CACHE_PERSIST:
+        _persist(key, vector)
+    return vector
+
+def get_embedding_cache_stats() -> dict:
+    with _lock:
+        lookups = sum(_stats.values())
+        hits = _stats["memory_hits"] + _stats["db_hits"]
+        return {
+            **_stats,
+            "size": len(_cache),
+            "max_size": EMBEDDING_CACHE_SIZE,
+            "persistent": EMBEDDING_CACHE_PERSIST,
+            "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+        }
@@ -0,0 +1,156 @@
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from core.database import SessionLocal
+from models.jobs import GenerationJob
+
+PREFETCH_JOB = "prefetch_course"
+
+# Retry settings for failed jobs: wait base * 2^(attempt-1) seconds, capped
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_BACKOFF_BASE_SECONDS = int(os.getenv("JOB_BACKOFF_BASE_SECONDS", "10"))
+JOB_BACKOFF_MAX_SECONDS = int(os.getenv("JOB_BACKOFF_MAX_SECONDS", "600"))
+# A "running" job whose worker has been silent this long is assumed dead and re-claimed
+JOB_LOCK_TIMEOUT_SECONDS = int(os.getenv("JOB_LOCK_TIMEOUT_SECONDS", "900"))
+# A job that finished cleanly this recently isn't started again (in either
+# PREFETCH_MODE), so polling a section that never becomes ready doesn't add a
+# job every poll; failures wait for an explicit retry (see may_restart)
+JOB_REQUEUE_COOLDOWN_SECONDS = int(os.getenv("JOB_REQUEUE_COOLDOWN_SECONDS", "300"))
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+def may_restart(
+    status: str, sections: dict, ended_seconds_ago: float, gave_up: bool, retry_failed: bool = False
+) -> bool:
+    """
+    Whether a new prefetch may follow the latest one for a user + course, in
+    either PREFETCH_MODE. Failures (the job gave up, or a section failed) are
+    only retried on request (enroll, right away), never by content polling;
+    a clean finish is run again only after the cooldown.
+    """
+    if status in ("pending", "running"):
+        return False
+    if gave_up or "failed" in (sections or {}).values():
+        return retry_failed
+    return ended_seconds_ago >= JOB_REQUEUE_COOLDOWN_SECONDS
+
+def may_requeue(job: Optional[GenerationJob], retry_failed: bool = False) -> bool:
+    """may_restart for the latest queued job (None: never queued)."""
+    if job is None:
+        return True
+    finished_at = job.updated_at or job.created_at
+    ended_seconds_ago = (_now() - finished_at).total_seconds() if finished_at else float("inf")
+    gave_up = job.status == "failed" and job.attempts >= job.max_attempts
+    return may_restart(job.status, job.progress, ended_seconds_ago, gave_up, retry_failed)
+
+def enqueue_prefetch(db: Session, user_id: int, course_id: int, retry_failed: bool = False) -> bool:
+    """
+    Queues course generation for a user. Returns False if an active job for the
+    same user + course already exists (the request joins that one), or if the
+    last one finished too recently / failed for good (see may_requeue).
+    """
+    if not may_requeue(get_latest_job(db, user_id, course_id), retry_failed):
+        db.rollback()
+        return False
+
+    result = db.execute(
+        insert(GenerationJob)
+        .values(
+            kind=PREFETCH_JOB,
+            user_id=user_id,
+            course_id=course_id,
+            status="pending",
+            attempts=0,
+            max_attempts=JOB_MAX_ATTEMPTS,
+        )
+        .on_conflict_do_nothing(
+            index_elements=["kind", "user_id", "course_id"],
+            index_where=GenerationJob.status.in_(["pending", "running"]),
+        )
+        .returning(GenerationJob.id)
+    )
+    created = result.scalar() is not None
+    db.commit()
+    return created
+
+def get_latest_job(db: Session, user_id: int, course_id: int) -> Optional[GenerationJob]:
+    return db.execute(
+        select(GenerationJob)
+        .filter_by(kind=PREFETCH_JOB, user_id=user_id, course_id=course_id)
+        .order_by(GenerationJob.id.desc())
+        .limit(1)
+    ).scalars().first()
+
+def is_section_queued(db: Session, user_id: int, course_id: int, section_id: int) -> bool:
+    """True while a worker's running job still has this section queued or generating."""
+    job = get_latest_job(db, user_id, course_id)
+    if not job or job.status != "running":
+        return False
+    return (job.progress or {}).get(str(section_id)) in ("queued", "generating")
+
+def claim_next_job(db: Session) -> Optional[GenerationJob]:
+    """
+    Atomically takes the next runnable job. SKIP LOCKED lets any number of
+    workers poll the same table without blocking on each other.
+    """
+    now = _now()
+    job = db.execute(
+        select(GenerationJob)
+        .where(or_(
+            and_(GenerationJob.status == "pending", GenerationJob.run_after <= now),
+            and_(
+                GenerationJob.status == "running",
+                GenerationJob.locked_at < now - timedelta(seconds=JOB_LOCK_TIMEOUT_SECONDS),
+            ),
+        ))
+        .order_by(GenerationJob.run_after, GenerationJob.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    ).scalars().first()
+
+    if not job:
+        db.rollback()
+        return None
+
+    job.status = "running"
+    job.attempts += 1
+    job.locked_at = now
+    db.commit()
+    return job
+
+def complete_job(db: Session, job: GenerationJob):
+    job.status = "done"
+    job.locked_at = None
+    job.last_error = None
+    db.commit()
+
+def fail_job(db: Session, job: GenerationJob, error: str):
+    """Schedules a retry with exponential backoff, or gives up after max_attempts."""
+    job.last_error = error
+    job.locked_at = None
+    if job.attempts >= job.max_attempts:
+        job.status = "failed"
+    else:
+        delay = min(JOB_BACKOFF_BASE_SECONDS * 2 ** (job.attempts - 1), JOB_BACKOFF_MAX_SECONDS)
+        job.status = "pending"
+        job.run_after = _now() + timedelta(seconds=delay)
+    db.commit()
+
+def record_progress(job_id: int, progress: dict):
+    """Writes per-section progress on its own short session (also acts as a heartbeat)."""
+    session = SessionLocal()
+    try:
+        session.execute(
+            update(GenerationJob)
+            .where(GenerationJob.id == job_id)
+            .values(progress=dict(progress), locked_at=_now())
+        )
+        session.commit()
+    finally:
+        session.close()
@@ -1,21 +1,344 @@
-from core.database import SessionLocal
-from models.knowledge import KnowledgeItem
-from core.llm import get_embeddings 
+import os
+from sqlalchemy import Integer, String, cast, column, func, literal, or_, select, text, values
+from sqlalchemy.dialects.postgresql import TSQUERY
+from sqlalchemy.orm import Session
+from pgvector import Vector as VectorValue
+from pgvector.sqlalchemy import Vector
 
-def search_knowledge_base(query: str, limit: int = 1):
+from core.database import SessionLocal, engine
+from models.knowledge_base import FACT_TSV_EXPRESSION, FULLTEXT_CONFIG, KnowledgeItem
+from services.embedding_cache import embed_query
+
+# --- VECTOR INDEX SETTINGS ---
+# Index type: "hnsw" (better recall/latency, slower build) or "ivfflat" (fast build)
+VECTOR_INDEX_TYPE = os.getenv("VECTOR_INDEX_TYPE", "hnsw").lower()
+# Distance: "l2", "cosine" or "ip" (inner product). Queries use the matching operator
+# so Postgres can actually use the index.
+VECTOR_DISTANCE = os.getenv("VECTOR_DISTANCE", "l2").lower()
+# Query-time recall knobs (higher = better recall, slower)
+VECTOR_EF_SEARCH = int(os.getenv("VECTOR_EF_SEARCH", "40"))
+VECTOR_IVFFLAT_PROBES = int(os.getenv("VECTOR_IVFFLAT_PROBES", "10"))
+# Topic/source filtered searches: with pgvector 0.8+ the ANN scan keeps going until
+# enough rows pass the filter ("strict_order", "relaxed_order" or "off"). Without it
+# the filtered candidates are ranked exactly over the topic partition (B-tree index).
+VECTOR_ITERATIVE_SCAN = os.getenv("VECTOR_ITERATIVE_SCAN", "strict_order").lower()
+
+EMBEDDING_INDEX_NAME = "ix_knowledge_item_embedding"
+FULLTEXT_INDEX_NAME = "ix_knowledge_item_fact_tsv"
+FILTER_INDEX_COLUMNS = ("topic", "source_url")
+
+# --- RETRIEVAL ---
+# "vector" (embedding only), "lexical" (full-text only) or "hybrid" (both, fused with RRF).
+# lexical/hybrid read knowledge_item.fact_tsv: run init_db.py (create_fulltext_index) first
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "vector").lower()
+# Candidates taken from each ranking before fusion
+RETRIEVAL_CANDIDATES = int(os.getenv("RETRIEVAL_CANDIDATES", "20"))
+# Reciprocal rank fusion constant: score = sum(1 / (RRF_K + rank))
+RRF_K = int(os.getenv("RRF_K", "60"))
+
+# --- INGEST DEDUP ---
+# A new fact is skipped if an existing fact with the same topic or source is
+# within this cosine distance (0 = identical meaning, 0.05 ~ a light rephrase).
+# Set to -1 to turn the check off.
+KNOWLEDGE_DEDUP_DISTANCE = float(os.getenv("KNOWLEDGE_DEDUP_DISTANCE", "0.05"))
+
+_OPERATOR_CLASSES = {
+    "l2": "vector_l2_ops",
+    "cosine": "vector_cosine_ops",
+    "ip": "vector_ip_ops",
+}
+
+def embedding_distance(query_vector):
+    """Distance expression that matches the operator class of the vector index."""
+    if VECTOR_DISTANCE == "cosine":
+        return KnowledgeItem.embedding.cosine_distance(query_vector)
+    if VECTOR_DISTANCE == "ip":
+        return KnowledgeItem.embedding.max_inner_product(query_vector)
+    return KnowledgeItem.embedding.l2_distance(query_vector)
+
+_iterative_scan_supported: bool | None = None
+
+def search_params_statement(ef_search: int | None = None, probes: int | None = None, iterative_scan: bool = False):
+    """SET LOCAL statement for the ANN recall knobs (current transaction only)."""
+    if VECTOR_INDEX_TYPE == "ivfflat":
+        knob, value = "ivfflat.probes", int(probes or VECTOR_IVFFLAT_PROBES)
+    else:
+        knob, value = "hnsw.ef_search", int(ef_search or VECTOR_EF_SEARCH)
+    if not iterative_scan:
+        return text(f"SET LOCAL {knob} = {value}")
+    # ivfflat only supports relaxed ordering
+    order = "relaxed_order" if VECTOR_INDEX_TYPE == "ivfflat" else VECTOR_ITERATIVE_SCAN
+    # set_config(..., true) == SET LOCAL, but both fit in one statement (asyncpg can't run two)
+    return text(
+        f"SELECT set_config('{knob}', '{value}', true), "
+        f"set_config('{VECTOR_INDEX_TYPE}.iterative_scan', '{order}', true)"
+    )
+
+def iterative_scan_available(session: Session) -> bool:
+    """True if filtered searches can use pgvector's iterative index scans (0.8+)."""
+    global _iterative_scan_supported
+    if VECTOR_ITERATIVE_SCAN == "off":
+        return False
+    if _iterative_scan_supported is None:
+        version = session.execute(
+            text("SELECT extversion FROM pg_extension WHERE extname = 'vector'")
+        ).scalar() or "0"
+        _iterative_scan_supported = tuple(int(part) for part in version.split(".")[:2]) >= (0, 8)
+    return _iterative_scan_supported
+
+def apply_search_params(
+    session: Session,
+    ef_search: int | None = None,
+    probes: int | None = None,
+    filtered: bool = False,
+) -> bool:
+    """
+    Sets the ANN recall knobs for the current transaction only. Returns whether a
+    filtered search may use the ANN index (iterative scan), for retrieval_query.
+    """
+    iterative_scan = filtered and iterative_scan_available(session)
+    session.execute(search_params_statement(ef_search=ef_search, probes=probes, iterative_scan=iterative_scan))
+    return iterative_scan
+
+def _cosine_distance(a: list[float], b: list[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = (sum(x * x for x in a) ** 0.5) * (sum(y * y for y in b) ** 0.5)
+    return 1 - dot / norm if norm else 1.0
+
+def batch_duplicate_indexes(rows: list[dict], max_distance: float | None = None) -> set[int]:
+    """Indexes of rows that repeat an earlier row of the same batch (same topic/source, close embedding)."""
+    max_distance = KNOWLEDGE_DEDUP_DISTANCE if max_distance is None else max_distance
+    duplicates = set()
+    for i, row in enumerate(rows):
+        for j in range(i):
+            if j in duplicates:
+                continue
+            other = rows[j]
+            same_scope = row["topic"] == other["topic"] or row["source_url"] == other["source_url"]
+            if same_scope and _cosine_distance(row["embedding"], other["embedding"]) <= max_distance:
+                duplicates.add(i)
+                break
+    return duplicates
+
+def existing_duplicates_query(rows: list[dict], max_distance: float | None = None):
+    """
+    One query for the whole batch: indexes of rows that already have a stored fact
+    with the same topic or source within max_distance (cosine).
+    """
+    max_distance = KNOWLEDGE_DEDUP_DISTANCE if max_distance is None else max_distance
+    incoming = values(
+        column("idx", Integer),
+        column("topic", String),
+        column("source_url", String),
+        column("embedding", String),
+        name="incoming",
+    ).data([
+        # Vectors travel as '[...]' text and are cast back, works with psycopg2 and asyncpg
+        (i, row["topic"], row["source_url"], VectorValue(row["embedding"]).to_text())
+        for i, row in enumerate(rows)
+    ])
+    nearest = (
+        select(func.min(KnowledgeItem.embedding.cosine_distance(cast(incoming.c.embedding, Vector))))
+        .where(or_(
+            KnowledgeItem.topic == incoming.c.topic,
+            KnowledgeItem.source_url == incoming.c.source_url,
+        ))
+        .scalar_subquery()
+    )
+    return select(incoming.c.idx).where(nearest <= max_distance)
+
+def _keyword_query(query_text: str):
+    # plainto_tsquery ANDs every word; OR them so a topic like "MPF contribution rules"
+    # still matches facts that only mention "MPF" (ts_rank_cd rewards matching more words)
+    return cast(
+        func.replace(cast(func.plainto_tsquery(FULLTEXT_CONFIG, query_text), String), "&", "|"),
+        TSQUERY,
+    )
+
+def _scope_filters(topic: str | None, source_url: str | None) -> list:
+    filters = []
+    if topic is not None:
+        filters.append(KnowledgeItem.topic == topic)
+    if source_url is not None:
+        filters.append(KnowledgeItem.source_url == source_url)
+    return filters
+
+def retrieval_query(
+    query_text: str,
+    query_vector,
+    limit: int = 5,
+    mode: str | None = None,
+    topic: str | None = None,
+    source_url: str | None = None,
+    iterative_scan: bool = False,
+):
+    """
+    SELECT of the top `limit` KnowledgeItems for a query, in one round trip.
+    hybrid: top RETRIEVAL_CANDIDATES by vector distance and by full-text rank,
+    merged with reciprocal rank fusion.
+    topic / source_url restrict every ranking to that partition. Unless the
+    transaction enabled an iterative scan (see apply_search_params) the filtered
+    vector ranking is exact, so the ANN index can't come back short of rows.
+    """
+    mode = (mode or RETRIEVAL_MODE).lower()
+    filters = _scope_filters(topic, source_url)
+    distance = embedding_distance(query_vector)
+    if filters and not iterative_scan:
+        # "+ 0" keeps the planner off the ANN index: it would stop after ef_search
+        # candidates, most of them from other topics. The B-tree finds the partition.
+        distance = distance + 0
+    if mode == "vector":
+        return select(KnowledgeItem).where(*filters).order_by(distance).limit(limit)
+
+    keywords = _keyword_query(query_text)
+    keyword_rank = func.ts_rank_cd(KnowledgeItem.fact_tsv, keywords)
+    lexical = select(KnowledgeItem).where(KnowledgeItem.fact_tsv.op("@@")(keywords), *filters)
+    if mode == "lexical":
+        return lexical.order_by(keyword_rank.desc(), KnowledgeItem.id).limit(limit)
+    if mode != "hybrid":
+        raise ValueError(f"Unsupported RETRIEVAL_MODE: {mode}")
+
+    vector_hits = (
+        select(KnowledgeItem.id, func.row_number().over(order_by=distance).label("rank"))
+        .where(*filters)
+        .order_by(distance)
+        .limit(RETRIEVAL_CANDIDATES)
+        .cte("vector_hits")
+    )
+    keyword_hits = (
+        select(KnowledgeItem.id, func.row_number().over(order_by=keyword_rank.desc()).label("rank"))
+        .where(KnowledgeItem.fact_tsv.op("@@")(keywords), *filters)
+        .order_by(keyword_rank.desc())
+        .limit(RETRIEVAL_CANDIDATES)
+        .cte("keyword_hits")
+    )
+    fused = (
+        select(
+            func.coalesce(vector_hits.c.id, keyword_hits.c.id).label("id"),
+            (
+                func.coalesce(literal(1.0) / (RRF_K + vector_hits.c.rank), 0.0)
+                + func.coalesce(literal(1.0) / (RRF_K + keyword_hits.c.rank), 0.0)
+            ).label("score"),
+        )
+        .select_from(vector_hits.outerjoin(keyword_hits, vector_hits.c.id == keyword_hits.c.id, full=True))
+        .subquery("fused")
+    )
+    return (
+        select(KnowledgeItem)
+        .join(fused, KnowledgeItem.id == fused.c.id)
+        .order_by(fused.c.score.desc(), KnowledgeItem.id)
+        .limit(limit)
+    )
+
+def create_fulltext_index():
+    """Adds the generated fact_tsv column + GIN index to an existing knowledge_item table."""
+    with engine.connect() as conn:
+        conn.execute(text(
+            "ALTER TABLE knowledge_item ADD COLUMN IF NOT EXISTS fact_tsv tsvector "
+            f"GENERATED ALWAYS AS ({FACT_TSV_EXPRESSION}) STORED"
+        ))
+        conn.execute(text(
+            f"CREATE INDEX IF NOT EXISTS {FULLTEXT_INDEX_NAME} ON knowledge_item USING gin (fact_tsv)"
+        ))
+        conn.commit()
+
+def create_filter_indexes():
+    """B-tree indexes on topic / source_url for tables created before they were in the model."""
+    with engine.connect() as conn:
+        for name in FILTER_INDEX_COLUMNS:
+            conn.execute(text(f"CREATE INDEX IF NOT EXISTS ix_knowledge_item_{name} ON knowledge_item ({name})"))
+        conn.commit()
+
+def _embedding_index_sql(name: str, ops: str, lists: int | None) -> str:
+    using = f"USING {VECTOR_INDEX_TYPE} (embedding {ops})"
+    options = f" WITH (lists = {lists})" if lists else ""
+    return f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON knowledge_item {using}{options}"
+
+def create_embedding_index(rebuild: bool = False) -> dict:
     """
-    Business Logic: Semantic Search
+    Creates the ANN index on knowledge_item.embedding (no-op if it exists).
+    With rebuild=True the index is rebuilt, e.g. after a large ingest or when
+    VECTOR_INDEX_TYPE / VECTOR_DISTANCE changed. Everything runs CONCURRENTLY,
+    so searches and inserts keep working during the (slow) build:
+    same definition -> REINDEX CONCURRENTLY, otherwise a new index is built
+    under a temporary name and swapped in.
+    """
+    if VECTOR_DISTANCE not in _OPERATOR_CLASSES:
+        raise ValueError(f"Unsupported VECTOR_DISTANCE: {VECTOR_DISTANCE}")
+    ops = _OPERATOR_CLASSES[VECTOR_DISTANCE]
+    building = f"{EMBEDDING_INDEX_NAME}_new"
+
+    # CONCURRENTLY can't run inside a transaction block
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        lists = None
+        if VECTOR_INDEX_TYPE == "ivfflat":
+            # pgvector guideline: lists ~= rows / 1000 (at least 1)
+            rows = conn.execute(text("SELECT count(*) FROM knowledge_item")).scalar()
+            lists = max(rows // 1000, 1)
+
+        # (access method, operator class, storage options) of the current index
+        current = conn.execute(
+            text(
+                "SELECT am.amname, opc.opcname, coalesce(c.reloptions, '{}') FROM pg_class c "
+                "JOIN pg_index i ON i.indexrelid = c.oid "
+                "JOIN pg_am am ON am.oid = c.relam "
+                "JOIN pg_opclass opc ON opc.oid = i.indclass[0] "
+                "WHERE c.relname = :name"
+            ),
+            {"name": EMBEDDING_INDEX_NAME},
+        ).first()
+
+        method = "exists"
+        if current is None:
+            conn.execute(text(_embedding_index_sql(EMBEDDING_INDEX_NAME, ops, lists)))
+            method = "created"
+        elif rebuild:
+            options = [f"lists={lists}"] if lists else []
+            same_definition = tuple(current) == (VECTOR_INDEX_TYPE, ops, options)
+            if same_definition:
+                conn.execute(text(f"REINDEX INDEX CONCURRENTLY {EMBEDDING_INDEX_NAME}"))
+                method = "reindexed"
+            else:
+                # Leftover of an interrupted rebuild (CONCURRENTLY leaves invalid indexes behind)
+                conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {building}"))
+                conn.execute(text(_embedding_index_sql(building, ops, lists)))
+                conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {EMBEDDING_INDEX_NAME}"))
+                conn.execute(text(f"ALTER INDEX {building} RENAME TO {EMBEDDING_INDEX_NAME}"))
+                method = "swapped"
+
+    return {
+        "index": EMBEDDING_INDEX_NAME,
+        "type": VECTOR_INDEX_TYPE,
+        "distance": VECTOR_DISTANCE,
+        "lists": lists,
+        "method": method,
+    }
+
+def search_knowledge_base(
+    query: str,
+    limit: int = 1,
+    ef_search: int | None = None,
+    probes: int | None = None,
+    mode: str | None = None,
+    topic: str | None = None,
+    source_url: str | None = None,
+):
+    """
+    Business Logic: Semantic (+ keyword) Search, see RETRIEVAL_MODE.
+    Optionally scoped to one research topic and/or source.
     """
     session = SessionLocal()
-    embeddings_model = get_embeddings()
-    
+
     try:
-        query_vector = embeddings_model.embed_query(query)
-        
-        results = session.query(KnowledgeItem).order_by(
-            KnowledgeItem.embedding.l2_distance(query_vector)
-        ).limit(limit).all()
-        
+        query_vector = embed_query(query)
+
+        filtered = topic is not None or source_url is not None
+        iterative_scan = apply_search_params(session, ef_search=ef_search, probes=probes, filtered=filtered)
+        results = session.execute(retrieval_query(
+            query, query_vector, limit=limit, mode=mode,
+            topic=topic, source_url=source_url, iterative_scan=iterative_scan,
+        )).scalars().all()
+
         return results
     finally:
-        session.close()
\ No newline at end of file
+        session.close()
@@ -0,0 +1,201 @@
+import hashlib
+import os
+import threading
+import warnings
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from langchain_core._api import LangChainBetaWarning
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.load import dumps, loads
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, Generation
+from pydantic import BaseModel
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import SQLAlchemyError
+
+from core.database import SessionLocal
+from models.llm_cache import LLMResponse
+
+# Opt-in: identical prompts are answered from the llm_response_cache table
+LLM_CACHE = os.getenv("LLM_CACHE", "false").lower() == "true"
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "50000"))
+# Calls above this temperature are meant to vary, so they always go upstream
+LLM_CACHE_MAX_TEMPERATURE = float(os.getenv("LLM_CACHE_MAX_TEMPERATURE", "0.7"))
+# Expired / least recently used rows are purged after this many writes
+LLM_CACHE_EVICT_EVERY = 100
+
+# USD per 1M tokens (input, output), used for the "dollars saved" estimate
+LLM_PRICES = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+}
+
+# loads() is marked beta, that's fine for data we wrote ourselves
+warnings.filterwarnings("ignore", category=LangChainBetaWarning, module=__name__)
+
+_stats = {"hits": 0, "misses": 0, "writes": 0, "bypassed_clients": 0, "saved_usd": 0.0}
+_stats_lock = threading.Lock()
+_caches: dict[str, "PostgresLLMCache"] = {}
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+def _cost(model_name: str, input_tokens: int, output_tokens: int) -> float:
+    input_price, output_price = LLM_PRICES.get(model_name, (0.0, 0.0))
+    return (input_tokens * input_price + output_tokens * output_price) / 1_000_000
+
+def _usage(return_val: RETURN_VAL_TYPE) -> tuple[int, int]:
+    input_tokens = output_tokens = 0
+    for generation in return_val:
+        usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+        input_tokens += usage.get("input_tokens", 0)
+        output_tokens += usage.get("output_tokens", 0)
+    return input_tokens, output_tokens
+
+def _serializable(return_val: RETURN_VAL_TYPE) -> RETURN_VAL_TYPE:
+    # with_structured_output puts the parsed pydantic object on the message,
+    # store it as a dict (the output parser accepts both)
+    result = []
+    for generation in return_val:
+        message = getattr(generation, "message", None)
+        parsed = message.additional_kwargs.get("parsed") if message else None
+        if isinstance(parsed, BaseModel):
+            message = message.model_copy(update={
+                "additional_kwargs": {**message.additional_kwargs, "parsed": parsed.model_dump()},
+            })
+            generation = generation.model_copy(update={"message": message})
+        result.append(generation)
+    return result
+
+class PostgresLLMCache(BaseCache):
+    """
+    LangChain cache backed by Postgres, shared by every API process and worker.
+    LangChain passes the prompt and an llm_string describing the model and its
+    call parameters (temperature, bound tools / structured-output schema), so
+    hashing both gives one row per distinct request.
+    """
+
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+
+    @staticmethod
+    def _key(prompt: str, llm_string: str) -> str:
+        return hashlib.sha256(f"{llm_string}\x00{prompt}".encode("utf-8")).hexdigest()
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        key = self._key(prompt, llm_string)
+        session = SessionLocal()
+        try:
+            record = session.get(LLMResponse, key)
+            if record and record.created_at < _now() - timedelta(seconds=LLM_CACHE_TTL_SECONDS):
+                session.delete(record)
+                session.commit()
+                record = None
+            if not record:
+                with _stats_lock:
+                    _stats["misses"] += 1
+                return None
+
+            session.execute(
+                update(LLMResponse)
+                .where(LLMResponse.key_hash == key)
+                .values(hits=LLMResponse.hits + 1, last_used_at=_now())
+            )
+            session.commit()
+            with _stats_lock:
+                _stats["hits"] += 1
+                _stats["saved_usd"] += _cost(record.model_name, record.input_tokens, record.output_tokens)
+            # Only revive generations, never anything carrying client config
+            return loads(record.response, allowed_objects=[ChatGeneration, Generation, AIMessage])
+        except SQLAlchemyError as e:
+            # A broken cache must never break generation
+            print(f"LLM cache lookup failed: {e}")
+            session.rollback()
+            return None
+        finally:
+            session.close()
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        input_tokens, output_tokens = _usage(return_val)
+        session = SessionLocal()
+        try:
+            session.execute(
+                insert(LLMResponse)
+                .values(
+                    key_hash=self._key(prompt, llm_string),
+                    model_name=self.model_name,
+                    response=dumps(_serializable(return_val)),
+                    input_tokens=input_tokens,
+                    output_tokens=output_tokens,
+                )
+                .on_conflict_do_nothing()
+            )
+            session.commit()
+        except SQLAlchemyError as e:
+            print(f"LLM cache write failed: {e}")
+            session.rollback()
+            return
+        finally:
+            session.close()
+
+        with _stats_lock:
+            _stats["writes"] += 1
+            evict = _stats["writes"] % LLM_CACHE_EVICT_EVERY == 0
+        if evict:
+            evict_llm_cache()
+
+    def clear(self, **kwargs) -> None:
+        session = SessionLocal()
+        try:
+            session.execute(delete(LLMResponse).where(LLMResponse.model_name == self.model_name))
+            session.commit()
+        finally:
+            session.close()
+
+def evict_llm_cache() -> int:
+    """Drops expired rows, then the least recently used ones above LLM_CACHE_MAX_ENTRIES."""
+    session = SessionLocal()
+    try:
+        expired = session.execute(
+            delete(LLMResponse)
+            .where(LLMResponse.created_at < _now() - timedelta(seconds=LLM_CACHE_TTL_SECONDS))
+        ).rowcount
+        overflow_keys = (
+            select(LLMResponse.key_hash)
+            .order_by(LLMResponse.last_used_at.desc())
+            .offset(LLM_CACHE_MAX_ENTRIES)
+        )
+        evicted = session.execute(
+            delete(LLMResponse).where(LLMResponse.key_hash.in_(overflow_keys))
+        ).rowcount
+        session.commit()
+        return expired + evicted
+    finally:
+        session.close()
+
+def get_llm_cache(model_name: str, temperature: float) -> Optional[PostgresLLMCache]:
+    """Cache to attach to a chat model, or None if caching is off for this call."""
+    if not LLM_CACHE:
+        return None
+    if temperature > LLM_CACHE_MAX_TEMPERATURE:
+        with _stats_lock:
+            _stats["bypassed_clients"] += 1
+        return None
+    cache = _caches.get(model_name)
+    if cache is None:
+        cache = _caches.setdefault(model_name, PostgresLLMCache(model_name))
+    return cache
+
+def get_llm_cache_stats() -> dict:
+    with _stats_lock:
+        lookups = _stats["hits"] + _stats["misses"]
+        return {
+            **_stats,
+            "saved_usd": round(_stats["saved_usd"], 6),
+            "enabled": LLM_CACHE,
+            "max_temperature": LLM_CACHE_MAX_TEMPERATURE,
+            "hit_rate": round(_stats["hits"] / lookups, 3) if lookups else 0.0,
+        }
@@ -0,0 +1,93 @@
+import hashlib
+import json
+import threading
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from models.curriculum import SectionPersonalization
+
+# Canonical interest buckets -> free-text aliases students tend to type.
+# Everyone in the same bucket shares one generated lesson per section.
+INTEREST_BUCKETS = {
+    "Gaming": ["gaming", "games", "video games", "videogames", "esports", "e-sports", "gamer", "minecraft", "fortnite"],
+    "Sports": ["sports", "sport", "football", "soccer", "basketball", "tennis", "badminton", "swimming", "running", "fitness", "gym"],
+    "Music": ["music", "singing", "guitar", "piano", "k-pop", "kpop", "concerts", "band"],
+    "Science": ["science", "physics", "chemistry", "biology", "space", "astronomy"],
+    "Technology": ["technology", "tech", "coding", "programming", "computers", "ai", "robotics"],
+    "Art": ["art", "drawing", "painting", "design", "photography", "anime", "manga"],
+    "Food": ["food", "cooking", "baking", "eating", "restaurants"],
+    "Travel": ["travel", "travelling", "traveling", "adventure", "hiking"],
+    "Movies": ["movies", "films", "film", "cinema", "tv", "netflix", "drama"],
+    "Fashion": ["fashion", "clothes", "shopping", "sneakers", "beauty", "makeup"],
+}
+DEFAULT_INTEREST = "General"
+
+_ALIASES = {
+    alias: bucket
+    for bucket, aliases in INTEREST_BUCKETS.items()
+    for alias in [bucket.lower(), *aliases]
+}
+
+_stats = {"hits": 0, "misses": 0}
+_stats_lock = threading.Lock()
+
+def normalize_interest(interests: str | None) -> str:
+    """
+    Maps a free-text interest list ("video games, Football") to canonical
+    buckets ("Gaming, Sports"). Unknown interests are kept, lower-cased.
+    """
+    if not interests:
+        return DEFAULT_INTEREST
+
+    buckets = set()
+    for raw in interests.split(","):
+        cleaned = " ".join(raw.lower().split())
+        if cleaned:
+            buckets.add(_ALIASES.get(cleaned, cleaned))
+
+    return ", ".join(sorted(buckets)) if buckets else DEFAULT_INTEREST
+
+def section_content_hash(master_content: str, master_quiz: dict | None) -> str:
+    """Version of a section: changes whenever the master content or quiz is edited."""
+    payload = json.dumps({"content": master_content, "quiz": master_quiz}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def get_shared_personalization(db: Session, section_id: int, content_hash: str, interest: str) -> dict | None:
+    record = db.query(SectionPersonalization).filter_by(
+        section_id=section_id,
+        content_hash=content_hash,
+        interest=interest,
+    ).first()
+
+    with _stats_lock:
+        _stats["hits" if record else "misses"] += 1
+
+    if not record:
+        return None
+    return {
+        "personalized_content": record.personalized_content,
+        "personalized_quiz": record.personalized_quiz,
+    }
+
+def save_shared_personalization(db: Session, section_id: int, content_hash: str, interest: str, result: dict):
+    """Stores a tutor result for reuse. Concurrent writers of the same key are ignored."""
+    db.execute(
+        insert(SectionPersonalization)
+        .values(
+            section_id=section_id,
+            content_hash=content_hash,
+            interest=interest,
+            personalized_content=result['personalized_content'],
+            personalized_quiz=result['personalized_quiz'],
+        )
+        .on_conflict_do_nothing(constraint="uq_section_personalization")
+    )
+
+def get_personalization_stats() -> dict:
+    with _stats_lock:
+        lookups = _stats["hits"] + _stats["misses"]
+        return {
+            **_stats,
+            "hit_rate": round(_stats["hits"] / lookups, 3) if lookups else 0.0,
+        }
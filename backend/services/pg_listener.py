@@ -0,0 +1,83 @@
+import select
+import threading
+from typing import Callable, Optional
+
+import psycopg2
+from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+from sqlalchemy import func, select as sql_select
+
+from core.database import engine
+
+# Seconds between reconnect attempts when the LISTEN connection drops
+LISTEN_RETRY_SECONDS = 5
+
+# channel -> callbacks(payload); on_reconnect runs after every (re)connect, since
+# notifications sent while we weren't listening are never delivered
+_handlers: dict[str, list[Callable[[str], None]]] = {}
+_reconnect_handlers: list[Callable[[], None]] = []
+_listener = {"thread": None, "stop": None, "connected": False}
+
+def subscribe(channel: str, on_notify: Callable[[str], None], on_reconnect: Optional[Callable[[], None]] = None):
+    """Register at import time; channels are LISTENed when the listener (re)connects."""
+    _handlers.setdefault(channel, []).append(on_notify)
+    if on_reconnect:
+        _reconnect_handlers.append(on_reconnect)
+
+def notify_statement(channel: str, payload: str = ""):
+    """Run in the transaction that made the change; Postgres delivers it on commit."""
+    return sql_select(func.pg_notify(channel, payload))
+
+def is_listening() -> bool:
+    return _listener["connected"]
+
+def _dispatch(channel: str, payload: str):
+    for handler in _handlers.get(channel, []):
+        try:
+            handler(payload)
+        except Exception as e:
+            print(f"Notification handler for {channel} failed: {e}")
+
+def _listen(stop: threading.Event):
+    cargs, cparams = engine.dialect.create_connect_args(engine.url)
+    while not stop.is_set():
+        conn = None
+        try:
+            conn = psycopg2.connect(*cargs, **cparams)
+            conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+            cursor = conn.cursor()
+            for channel in _handlers:
+                cursor.execute(f"LISTEN {channel}")
+            for handler in _reconnect_handlers:
+                handler()
+            _listener["connected"] = True
+
+            while not stop.is_set():
+                if select.select([conn], [], [], 1.0) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    notification = conn.notifies.pop(0)
+                    _dispatch(notification.channel, notification.payload)
+        except Exception as e:
+            print(f"Postgres listener error: {e}")
+            stop.wait(LISTEN_RETRY_SECONDS)
+        finally:
+            _listener["connected"] = False
+            if conn is not None:
+                conn.close()
+
+def start_listener():
+    """One LISTEN connection per process for every subscribed channel (started from the app lifespan)."""
+    if _listener["thread"] and _listener["thread"].is_alive():
+        return
+    stop = threading.Event()
+    thread = threading.Thread(target=_listen, args=(stop,), name="pg-listener", daemon=True)
+    _listener.update(thread=thread, stop=stop)
+    thread.start()
+
+def stop_listener(timeout: float = 5.0):
+    thread, stop = _listener["thread"], _listener["stop"]
+    if thread:
+        stop.set()
+        thread.join(timeout)
+        _listener.update(thread=None, stop=None)
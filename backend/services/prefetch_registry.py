@@ -0,0 +1,144 @@
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+from fastapi import BackgroundTasks
+from sqlalchemy.orm import Session
+
+from core.database import SessionLocal
+from services.job_queue import enqueue_prefetch, get_latest_job, may_restart
+from services.tutor_service import prefetch_course_content
+
+# "background": run in this web process via BackgroundTasks (no worker needed)
+# "queue": only enqueue into generation_jobs; `python worker.py` does the work
+PREFETCH_MODE = os.getenv("PREFETCH_MODE", "background").lower()
+
+# Finished jobs stay visible to the status endpoint for this long (failed ones
+# until an enroll retries them, like given-up jobs in the queue)
+FINISHED_JOB_TTL_SECONDS = 600
+
+@dataclass
+class PrefetchJob:
+    user_id: int
+    course_id: int
+    status: str = "running"                       # running | finished | failed
+    sections: dict = field(default_factory=dict)  # section_id -> queued/generating/ready/failed/skipped/deferred
+    stats: Optional[dict] = None
+    started_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+    triggers: int = 1                             # how many requests joined this job
+
+    def to_dict(self) -> dict:
+        return {
+            "user_id": self.user_id,
+            "course_id": self.course_id,
+            "status": self.status,
+            "sections": dict(self.sections),
+            "stats": self.stats,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "triggers": self.triggers,
+        }
+
+# (user_id, course_id) -> latest job
+_jobs: dict[tuple[int, int], PrefetchJob] = {}
+_lock = threading.Lock()
+
+def _ended_seconds_ago(job: PrefetchJob, now: float) -> float:
+    # finished_at is set just after the status, treat that gap as "just ended"
+    return now - (job.finished_at or now)
+
+def _may_replace(job: PrefetchJob, now: float, retry_failed: bool = False) -> bool:
+    return may_restart(job.status, job.sections, _ended_seconds_ago(job, now), job.status == "failed", retry_failed)
+
+def _prune_finished(now: float):
+    expired = [
+        key for key, job in _jobs.items()
+        if _ended_seconds_ago(job, now) > FINISHED_JOB_TTL_SECONDS and _may_replace(job, now)
+    ]
+    for key in expired:
+        del _jobs[key]
+
+def claim_prefetch_job(user_id: int, course_id: int, retry_failed: bool = False) -> tuple[PrefetchJob, bool]:
+    """
+    Single-flight: returns (job, True) if the caller must start a new job,
+    or (existing_job, False) if one is running for this user + course, or the
+    last one ended too recently / failed (same rules as the queue, see may_restart).
+    """
+    key = (user_id, course_id)
+    with _lock:
+        now = time.time()
+        _prune_finished(now)
+        job = _jobs.get(key)
+        if job and job.status == "running":
+            job.triggers += 1
+            return job, False
+        if job and not _may_replace(job, now, retry_failed):
+            return job, False
+
+        job = PrefetchJob(user_id=user_id, course_id=course_id)
+        _jobs[key] = job
+        return job, True
+
+def run_prefetch_job(job: PrefetchJob):
+    """Background task body: runs the prefetch and records per-section progress."""
+    def on_progress(section_id: int, status: str):
+        with _lock:
+            job.sections[section_id] = status
+
+    # Own session: the request's session is closed by the time this runs
+    db = SessionLocal()
+    try:
+        job.stats = prefetch_course_content(job.course_id, job.user_id, db, on_progress=on_progress)
+        job.status = "finished"
+    except Exception as e:
+        print(f"Prefetch job failed for Course {job.course_id}, User {job.user_id}: {e}")
+        job.status = "failed"
+    finally:
+        db.close()
+        job.finished_at = time.time()
+
+def get_prefetch_job(user_id: int, course_id: int) -> Optional[PrefetchJob]:
+    with _lock:
+        return _jobs.get((user_id, course_id))
+
+def schedule_prefetch(
+    db: Session,
+    background_tasks: BackgroundTasks,
+    user_id: int,
+    course_id: int,
+    retry_failed: bool = False,
+) -> bool:
+    """
+    Starts (or joins) course generation for a user. Returns True if new work was scheduled.
+    retry_failed: also retry a job that failed for good (enroll does, polling doesn't).
+    """
+    if PREFETCH_MODE == "queue":
+        return enqueue_prefetch(db, user_id, course_id, retry_failed=retry_failed)
+
+    job, is_new = claim_prefetch_job(user_id, course_id, retry_failed=retry_failed)
+    if is_new:
+        background_tasks.add_task(run_prefetch_job, job)
+    return is_new
+
+def get_prefetch_status(db: Session, user_id: int, course_id: int) -> dict:
+    if PREFETCH_MODE == "queue":
+        record = get_latest_job(db, user_id, course_id)
+        if not record:
+            return {"status": "idle", "sections": {}}
+        return {
+            "user_id": record.user_id,
+            "course_id": record.course_id,
+            # Same vocabulary as the in-process registry ("done" is the queue's name for it)
+            "status": "finished" if record.status == "done" else record.status,
+            "sections": record.progress or {},
+            "attempts": record.attempts,
+            "last_error": record.last_error,
+        }
+
+    job = get_prefetch_job(user_id, course_id)
+    if not job:
+        return {"status": "idle", "sections": {}}
+    return job.to_dict()
@@ -0,0 +1,79 @@
+import hashlib
+import json
+from typing import List
+
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.orm import Session
+
+from models.curriculum import QuizQuestion
+
+def quiz_content_hash(question: str, correct_answer: str, options: list | None) -> str:
+    payload = json.dumps([question, correct_answer, options or []], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def _row_values(q: dict) -> dict:
+    # Admin payload shape (question / options) -> QuizQuestion columns
+    return {"question_text": q['question'], "correct_answer": q['correct_answer'], "distractors": q['options']}
+
+def diff_quizzes(existing: List[QuizQuestion], incoming: List[dict]) -> dict:
+    """
+    Matches incoming quizzes to stored ones, first by id (quizzes loaded from
+    get_sections carry it), then by identical content, so unchanged questions
+    keep their ids. Returns the rows to insert / update and the ids to delete.
+    """
+    by_id = {q.id: q for q in existing}
+    by_hash: dict[str, list[int]] = {}
+    for q in existing:
+        by_hash.setdefault(quiz_content_hash(q.question_text, q.correct_answer, q.distractors), []).append(q.id)
+
+    matched, to_update, unmatched, unchanged = set(), [], [], 0
+    for q in incoming:
+        quiz_id = q.get("id")
+        if quiz_id in by_id and quiz_id not in matched:
+            matched.add(quiz_id)
+            values = _row_values(q)
+            stored = by_id[quiz_id]
+            if (stored.question_text, stored.correct_answer, stored.distractors) == tuple(values.values()):
+                unchanged += 1
+            else:
+                to_update.append({"id": quiz_id, **values})
+        else:
+            unmatched.append(q)
+
+    to_insert = []
+    for q in unmatched:
+        candidates = [i for i in by_hash.get(quiz_content_hash(q['question'], q['correct_answer'], q['options']), [])
+                      if i not in matched]
+        if candidates:
+            matched.add(candidates[0])
+            unchanged += 1
+        else:
+            to_insert.append(_row_values(q))
+
+    return {
+        "insert": to_insert,
+        "update": to_update,
+        "delete": [q.id for q in existing if q.id not in matched],
+        "unchanged": unchanged,
+    }
+
+def save_section_quizzes(db: Session, section_id: int, quiz_data: List[dict]) -> dict:
+    """Applies the quiz diff with one bulk statement per kind of change. Does not commit."""
+    existing = db.execute(
+        select(QuizQuestion).where(QuizQuestion.section_id == section_id).order_by(QuizQuestion.id)
+    ).scalars().all()
+    diff = diff_quizzes(existing, quiz_data)
+
+    if diff["update"]:
+        db.execute(update(QuizQuestion), diff["update"])
+    if diff["insert"]:
+        db.execute(insert(QuizQuestion), [{"section_id": section_id, **row} for row in diff["insert"]])
+    if diff["delete"]:
+        db.execute(delete(QuizQuestion).where(QuizQuestion.id.in_(diff["delete"])))
+
+    return {
+        "inserted": len(diff["insert"]),
+        "updated": len(diff["update"]),
+        "deleted": len(diff["delete"]),
+        "unchanged": diff["unchanged"],
+    }
@@ -0,0 +1,66 @@
+import os
+import threading
+import time
+from typing import List, Optional
+
+from services import pg_listener
+
+# Postgres channel the admin endpoints NOTIFY after changing research_domains
+SAFE_DOMAINS_CHANNEL = "research_domains_changed"
+# Without a connected listener (scripts, listener down) the cached list is only
+# trusted for this long; with one it is kept until a NOTIFY arrives
+SAFE_DOMAINS_CACHE_TTL_SECONDS = float(os.getenv("SAFE_DOMAINS_CACHE_TTL_SECONDS", "60"))
+
+_lock = threading.Lock()
+_cache = {"domains": None, "loaded_at": 0.0, "generation": 0}
+_stats = {"hits": 0, "loads": 0, "invalidations": 0, "notifications": 0}
+
+def safe_domains_generation() -> int:
+    """Read before querying the DB, pass to remember_safe_domains."""
+    with _lock:
+        return _cache["generation"]
+
+def cached_safe_domains() -> Optional[List[str]]:
+    with _lock:
+        domains = _cache["domains"]
+        if domains is None:
+            return None
+        if not pg_listener.is_listening() and time.monotonic() - _cache["loaded_at"] > SAFE_DOMAINS_CACHE_TTL_SECONDS:
+            _cache["domains"] = None
+            return None
+        _stats["hits"] += 1
+        return list(domains)
+
+def remember_safe_domains(domains: List[str], generation: int) -> List[str]:
+    with _lock:
+        _stats["loads"] += 1
+        # Invalidated while we were querying: the list may already be stale, don't keep it
+        if generation == _cache["generation"]:
+            _cache["domains"] = list(domains)
+            _cache["loaded_at"] = time.monotonic()
+    return domains
+
+def invalidate_safe_domains():
+    with _lock:
+        _cache["domains"] = None
+        _cache["generation"] += 1
+        _stats["invalidations"] += 1
+
+def notify_statement():
+    """Run in the transaction that changes research_domains; delivered on commit."""
+    return pg_listener.notify_statement(SAFE_DOMAINS_CHANNEL)
+
+def _on_notify(payload: str):
+    with _lock:
+        _stats["notifications"] += 1
+    invalidate_safe_domains()
+
+pg_listener.subscribe(SAFE_DOMAINS_CHANNEL, _on_notify, on_reconnect=invalidate_safe_domains)
+
+def get_safe_domains_stats() -> dict:
+    with _lock:
+        return {
+            **_stats,
+            "cached": _cache["domains"] is not None,
+            "listener_connected": pg_listener.is_listening(),
+        }
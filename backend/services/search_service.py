@@ -0,0 +1,187 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Protocol
+
+# Results requested per sub-query
+SEARCH_MAX_RESULTS = int(os.getenv("SEARCH_MAX_RESULTS", "3"))
+# How many sub-queries a topic is expanded into (the topic itself counts as one)
+SEARCH_SUBQUERY_COUNT = int(os.getenv("SEARCH_SUBQUERY_COUNT", "4"))
+# Search responses are reused for this long per (query, allowed domains)
+SEARCH_CACHE_TTL_SECONDS = int(os.getenv("SEARCH_CACHE_TTL_SECONDS", "3600"))
+SEARCH_CACHE_SIZE = int(os.getenv("SEARCH_CACHE_SIZE", "256"))
+# "tavily" or "fixture" (reads SEARCH_FIXTURE_PATH, no network)
+SEARCH_CLIENT = os.getenv("SEARCH_CLIENT", "tavily").lower()
+SEARCH_FIXTURE_PATH = os.getenv("SEARCH_FIXTURE_PATH", "")
+
+# Angles appended to the topic; cheap, deterministic and cache friendly
+SUBQUERY_TEMPLATES = [
+    "{topic}",
+    "{topic} definition and key terms",
+    "{topic} rules, limits and eligibility",
+    "{topic} fees, rates and contributions",
+    "{topic} examples and common mistakes",
+]
+
+class SearchClient(Protocol):
+    """Anything that can run one web search. Results are dicts with at least url + content."""
+
+    def search(self, query: str, include_domains: List[str], max_results: int) -> List[dict]: ...
+
+    async def asearch(self, query: str, include_domains: List[str], max_results: int) -> List[dict]: ...
+
+class TavilySearchClient:
+    def _tool(self, include_domains: List[str], max_results: int):
+        # Imported here so the fixture client works without Tavily credentials
+        from langchain_tavily import TavilySearch
+        return TavilySearch(max_results=max_results, include_domains=include_domains)
+
+    def search(self, query: str, include_domains: List[str], max_results: int) -> List[dict]:
+        return self._tool(include_domains, max_results).invoke(query).get("results", [])
+
+    async def asearch(self, query: str, include_domains: List[str], max_results: int) -> List[dict]:
+        return (await self._tool(include_domains, max_results).ainvoke(query)).get("results", [])
+
+class FixtureSearchClient:
+    """
+    Offline stand-in for Tavily. The fixture is a JSON object mapping a query to
+    its results; "*" is used for queries that are not listed.
+    """
+
+    def __init__(self, path: str):
+        with open(path, encoding="utf-8") as f:
+            self.responses: dict = json.load(f)
+        self.calls: List[str] = []
+
+    def search(self, query: str, include_domains: List[str], max_results: int) -> List[dict]:
+        self.calls.append(query)
+        results = self.responses.get(query, self.responses.get("*", []))
+        if include_domains:
+            results = [r for r in results if any(domain in r["url"] for domain in include_domains)]
+        return results[:max_results]
+
+    async def asearch(self, query: str, include_domains: List[str], max_results: int) -> List[dict]:
+        return self.search(query, include_domains, max_results)
+
+_client: Optional[SearchClient] = None
+_cache: OrderedDict = OrderedDict()
+_lock = threading.Lock()
+_stats = {"queries": 0, "cache_hits": 0, "duplicates_dropped": 0}
+
+def get_search_client() -> SearchClient:
+    global _client
+    if _client is None:
+        _client = FixtureSearchClient(SEARCH_FIXTURE_PATH) if SEARCH_CLIENT == "fixture" else TavilySearchClient()
+    return _client
+
+def set_search_client(client: Optional[SearchClient]):
+    """Swap the search backend (tests); None goes back to the configured one."""
+    global _client
+    _client = client
+    clear_search_cache()
+
+def clear_search_cache():
+    with _lock:
+        _cache.clear()
+
+def expand_queries(topic: str, count: Optional[int] = None) -> List[str]:
+    count = SEARCH_SUBQUERY_COUNT if count is None else count
+    return [template.format(topic=topic) for template in SUBQUERY_TEMPLATES[:max(count, 1)]]
+
+def _cache_key(query: str, include_domains: List[str]) -> tuple:
+    return " ".join(query.lower().split()), tuple(sorted(include_domains))
+
+def _cached(key: tuple) -> Optional[List[dict]]:
+    with _lock:
+        _stats["queries"] += 1
+        entry = _cache.get(key)
+        if not entry:
+            return None
+        expires_at, results = entry
+        if expires_at < time.monotonic():
+            del _cache[key]
+            return None
+        _cache.move_to_end(key)
+        _stats["cache_hits"] += 1
+        return results
+
+def _remember(key: tuple, results: List[dict]):
+    with _lock:
+        _cache[key] = (time.monotonic() + SEARCH_CACHE_TTL_SECONDS, results)
+        _cache.move_to_end(key)
+        while len(_cache) > SEARCH_CACHE_SIZE:
+            _cache.popitem(last=False)
+
+def _search_one(query: str, include_domains: List[str]) -> List[dict]:
+    key = _cache_key(query, include_domains)
+    results = _cached(key)
+    if results is None:
+        results = get_search_client().search(query, include_domains, SEARCH_MAX_RESULTS)
+        _remember(key, results)
+    return results
+
+async def _asearch_one(query: str, include_domains: List[str]) -> List[dict]:
+    key = _cache_key(query, include_domains)
+    results = _cached(key)
+    if results is None:
+        results = await get_search_client().asearch(query, include_domains, SEARCH_MAX_RESULTS)
+        _remember(key, results)
+    return results
+
+def dedupe_results(result_lists: List[List[dict]]) -> List[dict]:
+    """Flattens per-query results, keeping the first hit per URL and per identical content."""
+    seen_urls, seen_content, unique = set(), set(), []
+    for results in result_lists:
+        for res in results:
+            url = res["url"].split("#")[0].rstrip("/").lower()
+            content_hash = hashlib.sha256(" ".join(res["content"].split()).lower().encode("utf-8")).hexdigest()
+            if url in seen_urls or content_hash in seen_content:
+                with _lock:
+                    _stats["duplicates_dropped"] += 1
+                continue
+            seen_urls.add(url)
+            seen_content.add(content_hash)
+            unique.append(res)
+    return unique
+
+def _drop_failures(queries: List[str], outcomes: list) -> List[List[dict]]:
+    # One failing sub-query shouldn't sink the others; if all fail, surface the error
+    errors = [o for o in outcomes if isinstance(o, Exception)]
+    if errors and len(errors) == len(outcomes):
+        raise errors[0]
+    for query, outcome in zip(queries, outcomes):
+        if isinstance(outcome, Exception):
+            print(f"Search failed for '{query}': {outcome}")
+    return [o for o in outcomes if not isinstance(o, Exception)]
+
+def search_many(queries: List[str], include_domains: List[str]) -> List[dict]:
+    """Runs all queries concurrently (threads) and returns deduplicated results."""
+    def run(query: str):
+        try:
+            return _search_one(query, include_domains)
+        except Exception as e:
+            return e
+
+    with ThreadPoolExecutor(max_workers=max(len(queries), 1)) as executor:
+        outcomes = list(executor.map(run, queries))
+    return dedupe_results(_drop_failures(queries, outcomes))
+
+async def asearch_many(queries: List[str], include_domains: List[str]) -> List[dict]:
+    """Async version of search_many."""
+    outcomes = await asyncio.gather(
+        *(_asearch_one(q, include_domains) for q in queries), return_exceptions=True
+    )
+    return dedupe_results(_drop_failures(queries, list(outcomes)))
+
+def get_search_stats() -> dict:
+    with _lock:
+        return {
+            **_stats,
+            "cache_size": len(_cache),
+            "hit_rate": round(_stats["cache_hits"] / _stats["queries"], 3) if _stats["queries"] else 0.0,
+        }
@@ -0,0 +1,181 @@
+import asyncio
+import json
+import os
+import time
+
+from core.database import SessionLocal
+from models.curriculum import Section
+from models.user import User, StudentProgress
+from agents.tutor_agent import astream_tutor_agent
+from services.personalization_service import (
+    normalize_interest,
+    section_content_hash,
+    get_shared_personalization,
+    save_shared_personalization,
+)
+from services.job_queue import is_section_queued
+from services.prefetch_registry import PREFETCH_MODE
+from services.tutor_service import (
+    acquire_llm_slot,
+    claim_section,
+    release_llm_slot,
+    release_section,
+    is_section_in_progress,
+    get_master_quiz,
+    save_section_result,
+)
+
+# How often the stream re-checks the DB while another job generates the section
+SSE_POLL_INTERVAL = float(os.getenv("SSE_POLL_INTERVAL", "1"))
+# Give up (client can reconnect) after this many seconds of waiting
+SSE_MAX_WAIT = float(os.getenv("SSE_MAX_WAIT", "180"))
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def _ready_payload(content: str, quiz: dict) -> dict:
+    return {"status": "ready", "content": content, "quiz": quiz}
+
+def _load_state(user_id: int, section_id: int) -> dict:
+    """
+    Blocking DB read (run in a thread). Returns one of:
+    ready / missing / no_content / generate (with everything the tutor needs).
+    """
+    db = SessionLocal()
+    try:
+        progress = db.query(StudentProgress).filter_by(user_id=user_id, section_id=section_id).first()
+        if progress and progress.personalized_content:
+            return {"state": "ready", "payload": _ready_payload(
+                progress.personalized_content, progress.personalized_quiz
+            )}
+
+        section = db.query(Section).filter(Section.id == section_id).first()
+        if not section:
+            return {"state": "missing"}
+        if not section.master_content:
+            return {"state": "no_content"}
+
+        user = db.query(User).filter(User.id == user_id).first()
+        interest = normalize_interest(user.interests if user else None)
+        quiz = get_master_quiz(db, section_id)
+        content_hash = section_content_hash(section.master_content, quiz)
+
+        shared = get_shared_personalization(db, section_id, content_hash, interest)
+        if shared:
+            save_section_result(db, user_id, section_id, shared)
+            return {"state": "ready", "payload": _ready_payload(
+                shared["personalized_content"], shared["personalized_quiz"]
+            )}
+
+        return {
+            "state": "generate",
+            "course_id": section.course_id,
+            "content": section.master_content,
+            "quiz": quiz,
+            "interest": interest,
+            "content_hash": content_hash,
+        }
+    finally:
+        db.close()
+
+def _generating_elsewhere(user_id: int, course_id: int, section_id: int) -> bool:
+    """In this process (prefetch job / other stream), or by worker.py in queue mode (blocking)."""
+    if is_section_in_progress(user_id, section_id):
+        return True
+    if PREFETCH_MODE != "queue":
+        return False
+    db = SessionLocal()
+    try:
+        return is_section_queued(db, user_id, course_id, section_id)
+    finally:
+        db.close()
+
+def _save(user_id: int, section_id: int, content_hash: str, interest: str, result: dict):
+    db = SessionLocal()
+    try:
+        save_shared_personalization(db, section_id, content_hash, interest, result)
+        save_section_result(db, user_id, section_id, result)
+    finally:
+        db.close()
+
+async def section_event_stream(user_id: int, section_id: int):
+    """
+    SSE body for one section. Events:
+      status  {"status": "queued" | "generating" | "waiting"}
+      token   {"content": "..."}          (lesson text as the LLM writes it)
+      ready   {"status": "ready", "content": ..., "quiz": ...}
+      error   {"detail": "..."}
+    """
+    state = await asyncio.to_thread(_load_state, user_id, section_id)
+    if state["state"] == "ready":
+        yield _sse("ready", state["payload"])
+        return
+    if state["state"] == "missing":
+        yield _sse("error", {"detail": "Section not found"})
+        return
+    if state["state"] == "no_content":
+        yield _sse("error", {"detail": "Section has no content yet"})
+        return
+
+    course_id = state["course_id"]
+
+    # CASE A: Nobody is working on it, generate it live
+    queued_in_worker = PREFETCH_MODE == "queue" and await asyncio.to_thread(
+        _generating_elsewhere, user_id, course_id, section_id
+    )
+    if not queued_in_worker and claim_section(user_id, section_id):
+        slot = False
+        try:
+            # Live streams share the PREFETCH_GLOBAL_CONCURRENCY limit with prefetch jobs.
+            # Poll instead of blocking a thread, so a client that leaves gives up its place.
+            slot = acquire_llm_slot(blocking=False)
+            if not slot:
+                yield _sse("status", {"status": "queued"})
+                deadline = time.monotonic() + SSE_MAX_WAIT
+                while not slot and time.monotonic() < deadline:
+                    await asyncio.sleep(SSE_POLL_INTERVAL)
+                    slot = acquire_llm_slot(blocking=False)
+                    if not slot:
+                        yield ": keep-alive\n\n"
+                if not slot:
+                    yield _sse("error", {"detail": "Too busy, please reconnect"})
+                    return
+
+            yield _sse("status", {"status": "generating"})
+            result = None
+            async for event in astream_tutor_agent(state["content"], state["quiz"], state["interest"]):
+                if event["type"] == "token":
+                    yield _sse("token", {"content": event["content"]})
+                else:
+                    result = event["data"]
+
+            await asyncio.to_thread(_save, user_id, section_id, state["content_hash"], state["interest"], result)
+            yield _sse("ready", _ready_payload(result["personalized_content"], result["personalized_quiz"]))
+        except Exception as e:
+            print(f"Error streaming section {section_id}: {e}")
+            yield _sse("error", {"detail": "Generation failed"})
+        finally:
+            if slot:
+                release_llm_slot()
+            release_section(user_id, section_id)
+        return
+
+    # CASE B: A prefetch job (or the worker) is already generating it, push the result when it lands
+    yield _sse("status", {"status": "waiting"})
+    deadline = time.monotonic() + SSE_MAX_WAIT
+    while time.monotonic() < deadline:
+        await asyncio.sleep(SSE_POLL_INTERVAL)
+        # Check before reading so a job finishing in between still counts as ready
+        still_running = await asyncio.to_thread(_generating_elsewhere, user_id, course_id, section_id)
+        state = await asyncio.to_thread(_load_state, user_id, section_id)
+        if state["state"] == "ready":
+            yield _sse("ready", state["payload"])
+            return
+        if not still_running:
+            # The other job gave up on this section; reconnecting generates it live
+            yield _sse("error", {"detail": "Generation failed, please reconnect"})
+            return
+        # Comment line keeps proxies from closing an idle connection
+        yield ": keep-alive\n\n"
+
+    yield _sse("error", {"detail": "Timed out, please reconnect"})
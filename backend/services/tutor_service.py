@@ -1,71 +1,199 @@
+import os
+import threading
+from typing import Callable, Optional
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
 from sqlalchemy.orm import Session
 from models.curriculum import Course, Section, QuizQuestion
 from models.user import User, StudentProgress
 from agents.tutor_agent import run_tutor_agent
+from services.personalization_service import (
+    normalize_interest,
+    section_content_hash,
+    get_shared_personalization,
+    save_shared_personalization,
+)
+
+# Max sections generated in parallel for one course (1 = old serial behaviour)
+PREFETCH_COURSE_CONCURRENCY = int(os.getenv("PREFETCH_COURSE_CONCURRENCY", "3"))
+# Max tutor agent runs in flight across ALL prefetch jobs in this process
+PREFETCH_GLOBAL_CONCURRENCY = int(os.getenv("PREFETCH_GLOBAL_CONCURRENCY", "8"))
+
+_global_llm_slots = threading.BoundedSemaphore(PREFETCH_GLOBAL_CONCURRENCY)
+
+# (user_id, section_id) currently being generated in this process, shared by
+# the prefetch job and the SSE stream so a section is never generated twice at once
+_sections_in_progress: set[tuple[int, int]] = set()
+_sections_lock = threading.Lock()
+
+def claim_section(user_id: int, section_id: int) -> bool:
+    with _sections_lock:
+        if (user_id, section_id) in _sections_in_progress:
+            return False
+        _sections_in_progress.add((user_id, section_id))
+        return True
+
+def release_section(user_id: int, section_id: int):
+    with _sections_lock:
+        _sections_in_progress.discard((user_id, section_id))
+
+def is_section_in_progress(user_id: int, section_id: int) -> bool:
+    with _sections_lock:
+        return (user_id, section_id) in _sections_in_progress
+
+def acquire_llm_slot(blocking: bool = True) -> bool:
+    """One of the PREFETCH_GLOBAL_CONCURRENCY tutor runs; live streams share the limit."""
+    return _global_llm_slots.acquire(blocking=blocking)
+
+def release_llm_slot():
+    _global_llm_slots.release()
+
+def get_master_quiz(db: Session, section_id: int) -> dict | None:
+    """First master quiz of a section in the shape the tutor agent expects."""
+    master_quiz = db.query(QuizQuestion).filter(QuizQuestion.section_id == section_id).first()
+    return {
+        "question_text": master_quiz.question_text,
+        "correct_answer": master_quiz.correct_answer,
+        "distractors": master_quiz.distractors
+    } if master_quiz else None
+
+def _generate_section(
+    user_id: int,
+    section_id: int,
+    content: str,
+    quiz: dict | None,
+    interest: str,
+    on_start: Callable[[], None],
+) -> dict | None:
+    """
+    Runs the tutor agent while holding one of the process-wide LLM slots.
+    Returns None if the section is already being generated elsewhere (e.g. a live SSE stream).
+    """
+    with _global_llm_slots:
+        if not claim_section(user_id, section_id):
+            return None
+        try:
+            on_start()
+            return run_tutor_agent(content, quiz, interest)
+        finally:
+            release_section(user_id, section_id)
 
-def prefetch_course_content(course_id: int, user_id: int, db: Session):
+def prefetch_course_content(
+    course_id: int,
+    user_id: int,
+    db: Session,
+    on_progress: Optional[Callable[[int, str], None]] = None,
+):
     """
-    Loops through ALL sections in a course.
-    Generates and caches content for the specific user context.
+    Generates and caches content for ALL sections of a course for the specific user context.
+    Sections are generated concurrently (bounded), front of the course first,
+    and each one is saved as soon as it is ready.
+    on_progress(section_id, status) is called as sections move through
+    "queued" -> "generating" -> "ready"/"failed" (or straight to "ready"/"skipped"),
+    or "deferred" when a live SSE stream was already generating it.
     """
+    report = on_progress or (lambda section_id, status: None)
     print(f"--- [Prefetch] Starting background generation for Course {course_id}, User {user_id} ---")
-    
+
     # 1. Get User Profile (for Interest)
     user = db.query(User).filter(User.id == user_id).first()
-    if not user: 
+    if not user:
         return
 
     # 2. Get All Sections
     course = db.query(Course).filter(Course.id == course_id).first()
     if not course:
         return
-        
-    for section in course.sections:
-        # 3. Check if already exists (Don't waste money)
+
+    # Students in the same interest bucket share generated lessons
+    interest = normalize_interest(user.interests)
+
+    # 3. Collect the work up front. The Session is not thread-safe, so only
+    # the LLM calls run in worker threads; all DB access stays on this thread.
+    pending = []
+    shared_hits = 0
+    for section in sorted(course.sections, key=lambda s: s.order_index or 0):
+        # Check if already exists (Don't waste money)
         existing_progress = db.query(StudentProgress).filter_by(
-            user_id=user_id, 
+            user_id=user_id,
             section_id=section.id
         ).first()
-        
+
         # If it exists and has content, skip
         if existing_progress and existing_progress.personalized_content:
+            report(section.id, "ready")
             continue
-            
-        # 4. If Master Content is missing, we can't generate
+
+        # If Master Content is missing, we can't generate
         if not section.master_content:
             print(f"Skipping Section {section.id}: No Master Content found.")
+            report(section.id, "skipped")
             continue
 
-        print(f"--- [Prefetch] Generating Section {section.id} ---")
+        # Prepare Quiz Data
+        quiz_dict = get_master_quiz(db, section.id)
 
-        # 5. Prepare Quiz Data
-        master_quiz = db.query(QuizQuestion).filter(QuizQuestion.section_id == section.id).first()
-        quiz_dict = {
-            "question_text": master_quiz.question_text,
-            "correct_answer": master_quiz.correct_answer,
-            "distractors": master_quiz.distractors
-        } if master_quiz else None
+        # Another student with the same interest may already have paid for this
+        content_hash = section_content_hash(section.master_content, quiz_dict)
+        shared = get_shared_personalization(db, section.id, content_hash, interest)
+        if shared:
+            save_section_result(db, user_id, section.id, shared)
+            shared_hits += 1
+            report(section.id, "ready")
+            continue
 
-        # 6. RUN AI (This takes ~3-5 seconds per section)
-        # Since this is in background, user doesn't feel the wait.
-        try:
-            result = run_tutor_agent(
-                section.master_content, 
-                quiz_dict, 
-                user.interests or "General"
+        pending.append((section.id, section.master_content, quiz_dict, content_hash))
+        report(section.id, "queued")
+
+    stats = {"shared_hits": shared_hits, "generated": 0, "failed": 0, "deferred": 0}
+    lookups = shared_hits + len(pending)
+    stats["hit_rate"] = round(shared_hits / lookups, 3) if lookups else 0.0
+
+    if not pending:
+        print(f"--- [Prefetch] Nothing to generate for Course {course_id} ({stats}) ---")
+        return stats
+
+    # 4. RUN AI (~3-5 seconds per section). Sections are submitted in course
+    # order, so the executor's FIFO queue starts the earliest lessons first.
+    with ThreadPoolExecutor(max_workers=max(PREFETCH_COURSE_CONCURRENCY, 1)) as executor:
+        futures = {}
+        for section_id, content, quiz_dict, content_hash in pending:
+            print(f"--- [Prefetch] Generating Section {section_id} ---")
+            on_start = lambda section_id=section_id: report(section_id, "generating")
+            future = executor.submit(
+                _generate_section, user_id, section_id, content, quiz_dict, interest, on_start
             )
-            
-            # 7. Save to DB
-            if not existing_progress:
-                new_progress = StudentProgress(user_id=user_id, section_id=section.id)
-                db.add(new_progress)
-                existing_progress = new_progress # Reference for update
-            
-            existing_progress.personalized_content = result['personalized_content']
-            existing_progress.personalized_quiz = result['personalized_quiz']
-            db.commit()
-            
-        except Exception as e:
-            print(f"Error generating section {section.id}: {e}")
-            
-    print(f"--- [Prefetch] Finished Course {course_id} ---")
\ No newline at end of file
+            futures[future] = (section_id, content_hash)
+
+        for future in as_completed(futures):
+            section_id, content_hash = futures[future]
+            try:
+                result = future.result()
+                if result is None:
+                    # Someone else (live stream) is generating and will save it
+                    stats["deferred"] += 1
+                    report(section_id, "deferred")
+                    continue
+                save_shared_personalization(db, section_id, content_hash, interest, result)
+                save_section_result(db, user_id, section_id, result)
+                stats["generated"] += 1
+                report(section_id, "ready")
+            except Exception as e:
+                db.rollback()
+                stats["failed"] += 1
+                report(section_id, "failed")
+                print(f"Error generating section {section_id}: {e}")
+
+    print(f"--- [Prefetch] Finished Course {course_id} ({stats}) ---")
+    return stats
+
+def save_section_result(db: Session, user_id: int, section_id: int, result: dict):
+    """Writes one generated section so the student can open it right away."""
+    progress = db.query(StudentProgress).filter_by(user_id=user_id, section_id=section_id).first()
+    if not progress:
+        progress = StudentProgress(user_id=user_id, section_id=section_id)
+        db.add(progress)
+
+    progress.personalized_content = result['personalized_content']
+    progress.personalized_quiz = result['personalized_quiz']
+    db.commit()
@@ -1,6 +1,7 @@
 from typing import Optional
 from pydantic import BaseModel, EmailStr
 
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from sqlalchemy.future import select
 
@@ -25,12 +26,21 @@ def get_user_by_email(db: Session, email: str) -> Optional[User]:
     result = db.execute(select(User).filter(User.email == email))
     return result.scalars().first()
 
+async def aget_user_by_id(db: AsyncSession, user_id: int) -> Optional[User]:
+    result = await db.execute(select(User).filter(User.id == user_id))
+    return result.scalars().first()
+
+async def aget_user_by_email(db: AsyncSession, email: str) -> Optional[User]:
+    result = await db.execute(select(User).filter(User.email == email))
+    return result.scalars().first()
+
 def get_user_by_username(db: Session, username: str) -> Optional[User]:
     result = db.execute(select(User).filter(User.username == username))
     return result.scalars().first()
 
-def create_user(db: Session, user: UserCreate) -> User:
-    hashed_pwd = get_pwd_hash(user.password)
+def create_user(db: Session, user: UserCreate, hashed_pwd: Optional[str] = None) -> User:
+    if hashed_pwd is None:
+        hashed_pwd = get_pwd_hash(user.password)
     db_user = User(username=user.username, email=user.email, hashed_pwd=hashed_pwd, interests=user.interests)
     db.add(db_user)
     db.commit()
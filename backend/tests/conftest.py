@@ -0,0 +1,38 @@
+"""
+Shared test fixtures. The `db` fixture needs the Postgres from docker-compose
+(DATABASE_URL): each test gets a session inside a transaction that is rolled
+back afterwards, and is skipped when Postgres isn't running.
+"""
+import pytest
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from core.database import engine, init_db
+from services.knowledge_service import create_fulltext_index
+
+
+@pytest.fixture
+def vector():
+    """vector(*head): 384-dim embedding (all-MiniLM-L6-v2 size) starting with `head`, zero padded."""
+    def build(*head: float) -> list[float]:
+        return list(head) + [0.0] * (384 - len(head))
+    return build
+
+
+@pytest.fixture
+def db():
+    try:
+        init_db()
+        create_fulltext_index()
+        connection = engine.connect()
+    except OperationalError:
+        pytest.skip("Postgres is not running (docker compose up db)")
+
+    transaction = connection.begin()
+    session = Session(bind=connection, join_transaction_mode="create_savepoint")
+    try:
+        yield session
+    finally:
+        session.close()
+        transaction.rollback()
+        connection.close()
@@ -0,0 +1,65 @@
+"""
+Bulk course import (db fixture: conftest.py).
+
+    pytest tests/test_course_import.py
+"""
+import json
+
+import pytest
+from sqlalchemy import select
+
+from models.curriculum import Course, QuizQuestion, Section
+from services.course_import import import_courses, parse_course_import
+
+
+def course(title: str, sections: int, quizzes: int = 0) -> dict:
+    return {
+        "course_title": title,
+        "course_description": f"{title} description",
+        "sections": [
+            {
+                "title": f"{title} {i}",
+                "search_query": f"{title} query {i}",
+                "quizzes": [
+                    {"question": f"Q{q}", "options": ["a", "b", "c", "d"], "correct_answer": "a"}
+                    for q in range(quizzes)
+                ],
+            }
+            for i in range(sections)
+        ],
+    }
+
+
+def test_json_and_ndjson_bodies_parse_the_same():
+    courses = [course("Saving", 2), course("Tax", 1, quizzes=2)]
+    as_json = parse_course_import(json.dumps({"courses": courses}).encode(), "application/json")
+    as_ndjson = parse_course_import(
+        "\n".join(json.dumps(c) for c in courses).encode(), "application/x-ndjson"
+    )
+    assert as_json == as_ndjson
+    assert as_json[1].sections[0].quizzes[1].question == "Q1"
+
+    with pytest.raises(ValueError, match="line 2"):
+        parse_course_import(b'{"course_title": "ok"}\n{"sections": []}', "application/x-ndjson")
+
+
+def test_import_links_sections_and_quizzes_to_their_parents(db):
+    courses = parse_course_import(
+        json.dumps([course("import-a", 3), course("import-b", 2, quizzes=2)]).encode(), "application/json"
+    )
+    result = import_courses(db, courses)
+    assert (result["courses"], result["sections"], result["quizzes"]) == (2, 5, 4)
+
+    a_id, b_id = result["course_ids"]
+    assert db.get(Course, a_id).title == "import-a"
+    sections = db.execute(
+        select(Section).where(Section.course_id == b_id).order_by(Section.order_index)
+    ).scalars().all()
+    assert [(s.title, s.order_index, s.key_facts) for s in sections] == [
+        ("import-b 0", 1, {"search_query": "import-b query 0"}),
+        ("import-b 1", 2, {"search_query": "import-b query 1"}),
+    ]
+    quizzes = db.execute(
+        select(QuizQuestion).where(QuizQuestion.section_id == sections[1].id)
+    ).scalars().all()
+    assert [q.question_text for q in quizzes] == ["Q0", "Q1"]
@@ -0,0 +1,54 @@
+"""
+Re-queue rules of the generation job queue (db fixture: conftest.py).
+
+    pytest tests/test_job_queue.py
+"""
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import update
+
+from models.curriculum import Course
+from models.jobs import GenerationJob
+from models.user import User
+from services.job_queue import enqueue_prefetch, get_latest_job
+
+
+def finish(db, job: GenerationJob, status: str, attempts: int, minutes_ago: int, progress: dict | None = None):
+    # Explicit updated_at, otherwise onupdate stamps it with now()
+    db.execute(
+        update(GenerationJob)
+        .where(GenerationJob.id == job.id)
+        .values(status=status, attempts=attempts, progress=progress,
+                updated_at=datetime.now(timezone.utc) - timedelta(minutes=minutes_ago))
+    )
+    db.commit()
+    db.expire_all()
+
+
+def test_polling_does_not_pile_up_jobs(db):
+    suffix = uuid.uuid4().hex[:8]
+    user = User(username=f"queue_{suffix}", email=f"{suffix}@example.com", hashed_pwd="x")
+    course = Course(title="queue-test")
+    db.add_all([user, course])
+    db.flush()
+
+    assert enqueue_prefetch(db, user.id, course.id)
+    assert not enqueue_prefetch(db, user.id, course.id)     # still pending
+
+    job = get_latest_job(db, user.id, course.id)
+    finish(db, job, "done", attempts=1, minutes_ago=1)
+    assert not enqueue_prefetch(db, user.id, course.id)     # finished within the cooldown
+    finish(db, job, "done", attempts=1, minutes_ago=60)
+    assert enqueue_prefetch(db, user.id, course.id)
+
+    job = get_latest_job(db, user.id, course.id)
+    finish(db, job, "failed", attempts=job.max_attempts, minutes_ago=60)
+    assert not enqueue_prefetch(db, user.id, course.id)     # gave up, polling can't reset it
+    assert enqueue_prefetch(db, user.id, course.id, retry_failed=True)
+
+    job = get_latest_job(db, user.id, course.id)
+    finish(db, job, "done", attempts=1, minutes_ago=1, progress={"7": "failed"})
+    assert not enqueue_prefetch(db, user.id, course.id)     # a section failed: enroll retries it, right away
+    assert enqueue_prefetch(db, user.id, course.id, retry_failed=True)
+    assert db.query(GenerationJob).filter_by(user_id=user.id).count() == 4
@@ -0,0 +1,39 @@
+"""
+Ingest dedup tests for the research agent's save step (db and vector fixtures: conftest.py).
+
+    pytest tests/test_knowledge_dedup.py
+"""
+from models.knowledge_base import KnowledgeItem
+from services.knowledge_service import batch_duplicate_indexes, existing_duplicates_query
+
+
+def row(topic: str, source_url: str, embedding: list[float]) -> dict:
+    return {"topic": topic, "fact_text": "", "source_url": source_url, "embedding": embedding}
+
+
+def test_batch_duplicates_need_same_topic_or_source(vector):
+    rows = [
+        row("MPF", "a", vector(1, 0)),
+        row("MPF", "b", vector(1, 0.01)),     # same topic, near-identical
+        row("Tax", "c", vector(1, 0)),        # different topic and source
+        row("Tax", "a", vector(1, 0.02)),     # same source as the first
+        row("MPF", "d", vector(0, 1)),        # same topic, different meaning
+    ]
+    assert batch_duplicate_indexes(rows, max_distance=0.05) == {1, 3}
+
+
+def test_existing_duplicates_are_found_in_one_query(db, vector):
+    db.add_all([
+        KnowledgeItem(topic="dedup-test", fact_text="x", source_url="https://a", embedding=vector(1, 0)),
+        KnowledgeItem(topic="other", fact_text="y", source_url="https://b", embedding=vector(0, 1)),
+    ])
+    db.flush()
+
+    rows = [
+        row("dedup-test", "https://new", vector(1, 0.01)),  # near a stored fact, same topic
+        row("dedup-test", "https://new", vector(0, 1)),     # close only to a fact of another topic
+        row("unrelated", "https://b", vector(0, 1)),        # same source as a stored fact
+        row("unrelated", "https://c", vector(1, 0)),        # no shared topic/source
+    ]
+    found = set(db.execute(existing_duplicates_query(rows, max_distance=0.05)).scalars())
+    assert found == {0, 2}
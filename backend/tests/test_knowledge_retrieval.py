@@ -0,0 +1,38 @@
+"""
+Topic-scoped retrieval tests (db and vector fixtures: conftest.py).
+
+    pytest tests/test_knowledge_retrieval.py
+"""
+import pytest
+
+from models.knowledge_base import KnowledgeItem
+from services.knowledge_service import apply_search_params, retrieval_query
+
+
+@pytest.mark.parametrize("mode", ["vector", "lexical", "hybrid"])
+def test_scoped_search_only_returns_the_partition(db, vector, mode):
+    # Lots of closer facts from another topic, only a few in the one we ask for
+    db.add_all([
+        KnowledgeItem(topic="scope-other", fact_text="MPF contribution", source_url=f"https://o/{i}",
+                      embedding=vector(1, i / 1000))
+        for i in range(60)
+    ] + [
+        KnowledgeItem(topic="scope-mpf", fact_text="MPF contribution", source_url=f"https://m/{i}",
+                      embedding=vector(0.2, 1, i / 10))
+        for i in range(3)
+    ])
+    db.flush()
+
+    iterative_scan = apply_search_params(db, filtered=True)
+    found = db.execute(retrieval_query(
+        "MPF contribution", vector(1, 0), limit=5, mode=mode,
+        topic="scope-mpf", iterative_scan=iterative_scan,
+    )).scalars().all()
+    # The whole partition, even though the 60 other facts are all nearer
+    assert sorted(item.source_url for item in found) == ["https://m/0", "https://m/1", "https://m/2"]
+
+    found = db.execute(retrieval_query(
+        "MPF contribution", vector(1, 0), limit=5, mode=mode,
+        topic="scope-mpf", source_url="https://m/1", iterative_scan=iterative_scan,
+    )).scalars().all()
+    assert [item.source_url for item in found] == ["https://m/1"]
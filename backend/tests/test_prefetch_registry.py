@@ -0,0 +1,65 @@
+"""
+Re-trigger rules of the in-process prefetch registry (PREFETCH_MODE=background).
+
+    pytest tests/test_prefetch_registry.py
+"""
+import time
+
+import pytest
+from fastapi import BackgroundTasks
+
+from routers.student import _ended_without_section
+from services import prefetch_registry
+from services.job_queue import JOB_REQUEUE_COOLDOWN_SECONDS
+from services.prefetch_registry import get_prefetch_job, get_prefetch_status, schedule_prefetch
+
+USER_ID, COURSE_ID, SECTION_ID = 1, 2, 3
+
+
+@pytest.fixture(autouse=True)
+def registry(monkeypatch):
+    monkeypatch.setattr(prefetch_registry, "PREFETCH_MODE", "background")
+    monkeypatch.setattr(prefetch_registry, "_jobs", {})
+
+
+def end(status: str, seconds_ago: float = 0, sections: dict | None = None):
+    job = get_prefetch_job(USER_ID, COURSE_ID)
+    job.status, job.finished_at = status, time.time() - seconds_ago
+    job.sections = sections or {}
+
+
+def test_polling_after_the_job_ended_does_not_schedule_again():
+    tasks = BackgroundTasks()
+    assert schedule_prefetch(None, tasks, USER_ID, COURSE_ID)
+    end("finished", sections={SECTION_ID: "skipped"})
+
+    assert not schedule_prefetch(None, tasks, USER_ID, COURSE_ID)
+    assert not schedule_prefetch(None, tasks, USER_ID, COURSE_ID)
+    assert len(tasks.tasks) == 1
+    job = get_prefetch_status(None, USER_ID, COURSE_ID)
+    assert _ended_without_section(job, SECTION_ID)["status"] == "unavailable"
+
+    end("finished", seconds_ago=JOB_REQUEUE_COOLDOWN_SECONDS + 1)
+    assert schedule_prefetch(None, tasks, USER_ID, COURSE_ID)
+
+
+def test_failed_job_is_only_retried_by_enroll():
+    tasks = BackgroundTasks()
+    assert schedule_prefetch(None, tasks, USER_ID, COURSE_ID)
+    end("failed", seconds_ago=prefetch_registry.FINISHED_JOB_TTL_SECONDS + 1)
+
+    assert not schedule_prefetch(None, tasks, USER_ID, COURSE_ID)
+    job = get_prefetch_status(None, USER_ID, COURSE_ID)
+    assert _ended_without_section(job, SECTION_ID)["status"] == "failed"
+    assert schedule_prefetch(None, tasks, USER_ID, COURSE_ID, retry_failed=True)
+    assert len(tasks.tasks) == 2
+
+
+def test_failed_section_is_retried_by_enroll_right_away():
+    tasks = BackgroundTasks()
+    assert schedule_prefetch(None, tasks, USER_ID, COURSE_ID)
+    end("finished", seconds_ago=JOB_REQUEUE_COOLDOWN_SECONDS + 1, sections={SECTION_ID: "failed"})
+
+    assert not schedule_prefetch(None, tasks, USER_ID, COURSE_ID)
+    end("finished", sections={SECTION_ID: "failed"})
+    assert schedule_prefetch(None, tasks, USER_ID, COURSE_ID, retry_failed=True)
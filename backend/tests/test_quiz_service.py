@@ -0,0 +1,49 @@
+"""
+Diff-based quiz saves (db fixture: conftest.py).
+
+    pytest tests/test_quiz_service.py
+"""
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from models.curriculum import Course, QuizQuestion, Section
+from services.quiz_service import save_section_quizzes
+
+
+def quiz(question: str, answer: str = "a", **extra) -> dict:
+    return {"question": question, "options": ["a", "b", "c"], "correct_answer": answer, **extra}
+
+
+def stored(db: Session, section_id: int) -> dict[int, tuple]:
+    db.expire_all()
+    rows = db.execute(select(QuizQuestion).where(QuizQuestion.section_id == section_id)).scalars()
+    return {q.id: (q.question_text, q.correct_answer) for q in rows}
+
+
+def test_only_changed_quizzes_are_written(db):
+    course = Course(title="quiz-diff")
+    section = Section(course=course, title="s", order_index=1, master_content="")
+    db.add(section)
+    db.flush()
+
+    first = save_section_quizzes(db, section.id, [quiz("Q1"), quiz("Q2"), quiz("Q3")])
+    assert (first["inserted"], first["unchanged"]) == (3, 0)
+    ids = {text: quiz_id for quiz_id, (text, _) in stored(db, section.id).items()}
+
+    # Same content again (a fresh AI draft has no ids): nothing to do
+    again = save_section_quizzes(db, section.id, [quiz("Q1"), quiz("Q2"), quiz("Q3")])
+    assert again == {"inserted": 0, "updated": 0, "deleted": 0, "unchanged": 3}
+
+    # Edit Q1 by id, keep Q2 by content, drop Q3, add Q4
+    edited = save_section_quizzes(db, section.id, [
+        quiz("Q1 reworded", answer="b", id=ids["Q1"]),
+        quiz("Q2"),
+        quiz("Q4"),
+    ])
+    assert edited == {"inserted": 1, "updated": 1, "deleted": 1, "unchanged": 1}
+
+    after = stored(db, section.id)
+    assert after[ids["Q1"]] == ("Q1 reworded", "b")
+    assert after[ids["Q2"]] == ("Q2", "a")
+    assert ids["Q3"] not in after
+    assert sorted(text for text, _ in after.values()) == ["Q1 reworded", "Q2", "Q4"]
@@ -0,0 +1,61 @@
+"""
+Research domain allow-list cache. The listener test needs the Postgres from
+docker-compose (DATABASE_URL); it only sends a NOTIFY, nothing is written.
+
+    pytest tests/test_safe_domains.py
+"""
+import time
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from core.database import engine
+from services.pg_listener import is_listening, start_listener, stop_listener
+from services.safe_domains import (
+    cached_safe_domains,
+    invalidate_safe_domains,
+    notify_statement,
+    remember_safe_domains,
+    safe_domains_generation,
+)
+
+
+def wait_for(condition, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def test_load_racing_an_invalidation_is_not_cached():
+    invalidate_safe_domains()
+    generation = safe_domains_generation()
+    invalidate_safe_domains()              # admin edit lands while the query runs
+    remember_safe_domains(["old.example"], generation)
+    assert cached_safe_domains() is None
+
+    remember_safe_domains(["new.example"], safe_domains_generation())
+    assert cached_safe_domains() == ["new.example"]
+
+
+def test_notify_from_another_connection_invalidates():
+    try:
+        with engine.connect():
+            pass
+    except OperationalError:
+        pytest.skip("Postgres is not running (docker compose up db)")
+
+    start_listener()
+    try:
+        assert wait_for(lambda: is_listening())
+        remember_safe_domains(["a.example"], safe_domains_generation())
+        assert cached_safe_domains() == ["a.example"]
+
+        with engine.connect() as conn:
+            conn.execute(notify_statement())
+            conn.commit()
+        assert wait_for(lambda: cached_safe_domains() is None)
+    finally:
+        stop_listener()
@@ -0,0 +1,140 @@
+"""
+Fan-out search tests. Runs offline: the Tavily client is replaced by the JSON
+fixture in tests/fixtures (or small in-test clients).
+
+    pytest tests/test_search_service.py
+"""
+import asyncio
+import os
+import threading
+import time
+
+import pytest
+
+from agents.research_agent import search_node
+from services import search_service
+from services.search_service import FixtureSearchClient, asearch_many, expand_queries, search_many, set_search_client
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "search_results.json")
+DOMAINS = ["mpfa.org.hk", "ifec.org.hk", "hkma.gov.hk"]
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def fixture_client():
+    client = FixtureSearchClient(FIXTURE)
+    set_search_client(client)
+    yield client
+    set_search_client(None)
+
+
+class ConcurrencyClient:
+    """Records the peak number of searches in flight; each one waits (bounded) for a second to start."""
+
+    def __init__(self, timeout: float = 5.0):
+        self.timeout = timeout
+        self.in_flight = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+        self.overlapped = threading.Event()
+
+    def _enter(self):
+        with self.lock:
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+            if self.in_flight > 1:
+                self.overlapped.set()
+
+    def _leave(self):
+        with self.lock:
+            self.in_flight -= 1
+
+    def search(self, query, include_domains, max_results):
+        self._enter()
+        try:
+            self.overlapped.wait(self.timeout)
+        finally:
+            self._leave()
+        return [{"url": f"https://mpfa.org.hk/{query}", "content": query}]
+
+    async def asearch(self, query, include_domains, max_results):
+        self._enter()
+        try:
+            deadline = time.monotonic() + self.timeout
+            while not self.overlapped.is_set() and time.monotonic() < deadline:
+                await asyncio.sleep(0.01)
+        finally:
+            self._leave()
+        return [{"url": f"https://mpfa.org.hk/{query}", "content": query}]
+
+
+def test_dedupes_by_url_and_content(fixture_client):
+    results = search_many(expand_queries("MPF", 3), DOMAINS)
+    urls = [r["url"] for r in results]
+
+    # trailing-slash twin (same URL) and whitespace twin (same content) are dropped
+    assert urls == [
+        "https://www.mpfa.org.hk/en/mpf-system",
+        "https://www.ifec.org.hk/web/en/financial-products/mpf/index.page",
+        "https://www.mpfa.org.hk/en/glossary",
+        "https://www.mpfa.org.hk/en/limits",
+    ]
+
+
+def test_results_are_cached_per_query_and_domains(fixture_client):
+    queries = expand_queries("MPF", 3)
+    search_many(queries, DOMAINS)
+    search_many(queries, DOMAINS)
+    assert len(fixture_client.calls) == 3
+
+    search_many(queries, ["mpfa.org.hk"])
+    assert len(fixture_client.calls) == 6
+
+
+def test_cache_expires(fixture_client, monkeypatch):
+    monkeypatch.setattr(search_service, "SEARCH_CACHE_TTL_SECONDS", -1)
+    search_many(["MPF"], DOMAINS)
+    search_many(["MPF"], DOMAINS)
+    assert len(fixture_client.calls) == 2
+
+
+def test_unknown_queries_respect_allowed_domains(fixture_client):
+    assert search_many(["something else"], DOMAINS) == []
+
+
+def test_sync_fan_out_runs_concurrently():
+    client = ConcurrencyClient()
+    set_search_client(client)
+    try:
+        results = search_many(expand_queries("MPF", 4), DOMAINS)
+    finally:
+        set_search_client(None)
+
+    assert len(results) == 4
+    assert client.peak > 1
+
+
+async def test_async_fan_out_runs_concurrently():
+    client = ConcurrencyClient()
+    set_search_client(client)
+    try:
+        results = await asearch_many(expand_queries("MPF", 4), DOMAINS)
+    finally:
+        set_search_client(None)
+
+    assert len(results) == 4
+    assert client.peak > 1
+
+
+def test_search_node_combines_sources(fixture_client, monkeypatch):
+    monkeypatch.setattr(search_service, "SEARCH_SUBQUERY_COUNT", 3)
+    state = search_node({"topic": "MPF", "allowed_domains": DOMAINS})
+
+    assert state["raw_content"].count("Source: ") == 4
+    assert "HK$30,000" in state["raw_content"]
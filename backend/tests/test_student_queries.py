@@ -0,0 +1,150 @@
+"""
+Query-count regression tests for the student dashboard endpoints.
+
+Needs the Postgres from docker-compose (DATABASE_URL). Everything runs inside a
+transaction that is rolled back, so the database is left untouched.
+
+    pytest tests/test_student_queries.py
+"""
+import uuid
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from core.database import ASYNC_DATABASE_URL, init_db
+from models.curriculum import Course, Section
+from models.user import User, StudentProgress
+from routers.student import get_student_courses, get_course_details
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+async def db():
+    try:
+        init_db()
+    except OperationalError:
+        pytest.skip("Postgres is not running (docker compose up db)")
+
+    # NullPool: every test runs in its own event loop, asyncpg connections can't be shared
+    engine = create_async_engine(ASYNC_DATABASE_URL, poolclass=NullPool)
+    connection = await engine.connect()
+    transaction = await connection.begin()
+    session = AsyncSession(bind=connection, join_transaction_mode="create_savepoint", expire_on_commit=False)
+    try:
+        yield session
+    finally:
+        await session.close()
+        await transaction.rollback()
+        await connection.close()
+        await engine.dispose()
+
+
+class QueryCounter:
+    def __init__(self, connection):
+        self.connection = connection.sync_connection
+        self.count = 0
+
+    def _on_execute(self, *args):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(self.connection, "before_cursor_execute", self._on_execute)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.connection, "before_cursor_execute", self._on_execute)
+
+
+async def add_courses(db: AsyncSession, n: int, sections_per_course: int = 3) -> list[Course]:
+    courses = []
+    for i in range(n):
+        course = Course(title=f"Course {i}", description="", level="Beginner")
+        course.sections = [
+            Section(title=f"Section {j}", order_index=j + 1, master_content="", key_facts={})
+            for j in range(sections_per_course)
+        ]
+        courses.append(course)
+    db.add_all(courses)
+    await db.flush()
+    return courses
+
+
+async def make_user(db: AsyncSession) -> User:
+    suffix = uuid.uuid4().hex[:8]
+    user = User(username=f"student_{suffix}", email=f"{suffix}@example.com", hashed_pwd="x")
+    db.add(user)
+    await db.flush()
+    return user
+
+
+async def dashboard(db: AsyncSession, user: User, **kwargs) -> list[dict]:
+    return await get_student_courses(limit=kwargs.get("limit"), offset=kwargs.get("offset", 0), db=db, user=user)
+
+
+async def test_dashboard_query_count_is_constant(db):
+    user = await make_user(db)
+    await add_courses(db, 2)
+
+    with QueryCounter(await db.connection()) as small:
+        await dashboard(db, user)
+
+    await add_courses(db, 20)
+
+    with QueryCounter(await db.connection()) as large:
+        await dashboard(db, user)
+
+    assert small.count == large.count == 1
+
+
+async def test_dashboard_progress(db):
+    user = await make_user(db)
+    course = (await add_courses(db, 1))[0]
+    db.add(StudentProgress(user_id=user.id, section_id=course.sections[0].id, is_completed=True))
+    db.add(StudentProgress(user_id=user.id, section_id=course.sections[1].id, is_completed=False))
+    await db.flush()
+
+    row = next(c for c in await dashboard(db, user) if c["id"] == course.id)
+    assert row["progress"] == 33
+
+
+async def test_dashboard_pagination(db):
+    user = await make_user(db)
+    await add_courses(db, 5)
+
+    everything = await dashboard(db, user)
+    page = await dashboard(db, user, limit=2, offset=1)
+    assert [c["id"] for c in page] == [c["id"] for c in everything[1:3]]
+
+
+async def test_course_details_single_query_and_locks(db):
+    user = await make_user(db)
+    course = (await add_courses(db, 1, sections_per_course=4))[0]
+    first, second, third, fourth = sorted(course.sections, key=lambda s: s.order_index)
+    db.add(StudentProgress(user_id=user.id, section_id=first.id, is_completed=True, personalized_content="x" * 10_000))
+    db.add(StudentProgress(user_id=user.id, section_id=second.id, is_completed=False))
+    await db.flush()
+
+    with QueryCounter(await db.connection()) as counter:
+        details = await get_course_details(course.id, db=db, user=user)
+
+    assert counter.count == 1
+    assert [s["id"] for s in details["sections"]] == [first.id, second.id, third.id, fourth.id]
+    assert [s["is_completed"] for s in details["sections"]] == [True, False, False, False]
+    assert [s["is_locked"] for s in details["sections"]] == [False, False, True, True]
+
+
+async def test_course_details_missing_course(db):
+    user = await make_user(db)
+    with pytest.raises(HTTPException) as exc:
+        await get_course_details(-1, db=db, user=user)
+    assert exc.value.status_code == 404
@@ -0,0 +1,86 @@
+"""
+Standalone generation worker.
+
+Polls the generation_jobs table and runs course prefetch jobs outside the web
+process. Scale throughput by starting more of these:
+
+    python worker.py
+"""
+import os
+import threading
+import time
+import traceback
+
+from core.database import SessionLocal
+from services.job_queue import PREFETCH_JOB, claim_next_job, complete_job, fail_job, record_progress
+from services.tutor_service import prefetch_course_content
+
+# Jobs processed in parallel by this worker process
+WORKER_CONCURRENCY = int(os.getenv("WORKER_CONCURRENCY", "2"))
+# Seconds to sleep when the queue is empty
+WORKER_POLL_INTERVAL = float(os.getenv("WORKER_POLL_INTERVAL", "2"))
+
+def run_job(db, job):
+    progress = dict(job.progress or {})
+    progress_lock = threading.Lock()
+
+    # Called from the prefetch thread pool as well, hence the lock
+    def on_progress(section_id: int, status: str):
+        with progress_lock:
+            progress[str(section_id)] = status
+            record_progress(job.id, progress)
+
+    if job.kind == PREFETCH_JOB:
+        stats = prefetch_course_content(job.course_id, job.user_id, db, on_progress=on_progress)
+        # Sections that already succeeded are skipped on retry
+        if stats and stats["failed"]:
+            raise RuntimeError(f"{stats['failed']} section(s) failed to generate")
+    else:
+        raise ValueError(f"Unknown job kind: {job.kind}")
+
+def worker_loop(stop: threading.Event):
+    while not stop.is_set():
+        db = SessionLocal()
+        try:
+            job = claim_next_job(db)
+            if not job:
+                db.close()
+                stop.wait(WORKER_POLL_INTERVAL)
+                continue
+
+            print(f"--- [Worker] Job {job.id} ({job.kind}) attempt {job.attempts} ---")
+            try:
+                run_job(db, job)
+                complete_job(db, job)
+            except Exception as e:
+                db.rollback()
+                traceback.print_exc()
+                fail_job(db, job, str(e))
+        except Exception:
+            # DB hiccup while claiming, back off and retry
+            traceback.print_exc()
+            stop.wait(WORKER_POLL_INTERVAL)
+        finally:
+            db.close()
+
+def main():
+    stop = threading.Event()
+    threads = [
+        threading.Thread(target=worker_loop, args=(stop,), name=f"worker-{i}", daemon=True)
+        for i in range(WORKER_CONCURRENCY)
+    ]
+    for thread in threads:
+        thread.start()
+    print(f"Worker started with {WORKER_CONCURRENCY} slot(s). Ctrl+C to stop.")
+
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print("Stopping worker...")
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+if __name__ == "__main__":
+    main()